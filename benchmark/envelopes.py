@@ -0,0 +1,128 @@
+import json
+import uuid
+
+from constants import DialogState
+from dialog import DIALOG_STATE, initial_attributes, encode_session
+from directives import STATIC_KINDS, entity_id
+from user_profiles import PROFILE_FIELDS
+
+'''
+Envelopes
+    Synthesizes the Alexa request envelopes the skill receives, one per dialog state of CatchAllIntentHandler. Session
+    attributes are packed with the skill's session encoding, then JSON-encoded and decoded again so they reach the
+    skill exactly as Alexa would send them.
+
+    - intent_request(text, match, kind): CatchAllIntent request whose "text" slot resolves to the entity of the given
+      kind for match (through the static authority for the static kinds, the dynamic one otherwise), or does not
+      resolve when match is None
+    - launch_request(): LaunchRequest
+    - envelope(request, attributes, api_endpoint, user_id): full request envelope
+    - question_params(attributes): returns the question endpoint parameters the skill sends for the attributes
+    - dialog_states(catalog, iteration, question_id, submit_job): returns (branch name, request, encoded session
+      attributes) for every dialog state; the catalog entries used rotate with the iteration. The check answer turn
+      reads the job that submit_job(params) returns the id of, like the job a question turn leaves in the session
+    - load_envelopes(path): reads recorded envelopes (one JSON document per line)
+'''
+
+STATIC_AUTHORITY = "amzn1.er-authority.echo-sdk.benchmark.CATCHALL"
+DYNAMIC_AUTHORITY = "amzn1.er-authority.echo-sdk.dynamic.benchmark.CATCHALL"
+
+def intent_request(text, match = None, kind = None):
+    slot = {"name": "text", "value": text, "confirmationStatus": "NONE"}
+    static = {"authority": STATIC_AUTHORITY, "status": {"code": "ER_SUCCESS_NO_MATCH"}}
+    dynamic = {"authority": DYNAMIC_AUTHORITY, "status": {"code": "ER_SUCCESS_NO_MATCH"}}
+    if match is not None:
+        resolution = static if kind in STATIC_KINDS else dynamic
+        resolution["status"]["code"] = "ER_SUCCESS_MATCH"
+        resolution["values"] = [{"value": {"name": match, "id": entity_id(kind, match)}}]
+    slot["resolutions"] = {"resolutionsPerAuthority": [static, dynamic]}
+    return {
+        "type": "IntentRequest",
+        "requestId": "amzn1.echo-api.request." + uuid.uuid4().hex,
+        "timestamp": "2024-01-01T00:00:00Z",
+        "locale": "en-CA",
+        "dialogState": "STARTED",
+        "intent": {"name": "CatchAllIntent", "confirmationStatus": "NONE", "slots": {"text": slot}},
+    }
+
+def launch_request():
+    return {"type": "LaunchRequest", "requestId": "amzn1.echo-api.request." + uuid.uuid4().hex, "timestamp": "2024-01-01T00:00:00Z", "locale": "en-CA"}
+
+def envelope(request, attributes, api_endpoint, user_id = "amzn1.ask.account.benchmark"):
+    application = {"applicationId": "amzn1.ask.skill.benchmark"}
+    return {
+        "version": "1.0",
+        "session": {
+            "new": request["type"] == "LaunchRequest",
+            "sessionId": "amzn1.echo-api.session.benchmark",
+            "application": application,
+            "attributes": json.loads(json.dumps(attributes)),
+            "user": {"userId": user_id},
+        },
+        "context": {
+            "System": {
+                "application": application,
+                "user": {"userId": user_id},
+                "device": {"deviceId": "amzn1.ask.device.benchmark", "supportedInterfaces": {}},
+                "apiEndpoint": api_endpoint.rstrip("/"),
+                "apiAccessToken": "benchmark-token",
+            }
+        },
+        "request": request,
+    }
+
+def at_step(attributes, state, **values):
+    return encode_session(dict(attributes, **values, **{DIALOG_STATE: state}))
+
+def question_params(attributes):
+    specific = attributes["question_type"] == "specific"
+    return {
+        "faculty": attributes["faculty"],
+        "program": attributes["program"],
+        "specialization": attributes["specialization"] if specific else "",
+        "year": attributes["year_level"] if specific else "",
+        "topic": attributes["topic"],
+        "question": attributes["question"],
+    }
+
+def dialog_states(catalog, iteration = 0, question_id = 0, submit_job = None):
+    faculties = list(catalog)
+    faculty = faculties[iteration % len(faculties)]
+    programs = list(catalog[faculty])
+    program = programs[iteration % len(programs)]
+    specs = catalog[faculty][program]
+    spec = specs[iteration % len(specs)] if specs else ""
+    # a spoken fragment that matches several specializations, so the index search has work to do
+    spec_fragment = spec.split(" in ")[-1].split()[0].lower() if spec else "science"
+
+    attributes = initial_attributes()
+    states = [("launch", launch_request(), {})]
+
+    states.append(("handle_question_type", intent_request("program specific", "specific", "question_type"), at_step(attributes, DialogState.QUESTION_TYPE)))
+    attributes["question_type"] = "specific"
+    states.append(("handle_faculty", intent_request(faculty.lower(), faculty, "faculty"), at_step(attributes, DialogState.FACULTY)))
+    attributes["faculty"] = faculty
+    states.append(("handle_program", intent_request(program.lower(), program, "program"), at_step(attributes, DialogState.PROGRAM)))
+    attributes["program"] = program
+    states.append(("load_specialization", intent_request(spec_fragment), at_step(attributes, DialogState.LOAD_SPECIALIZATION)))
+    states.append(("handle_specialization", intent_request(spec.lower(), spec, "specialization"), at_step(attributes, DialogState.SPECIALIZATION)))
+    attributes["specialization"] = spec
+    states.append(("handle_year_level", intent_request("third year", "Third Year", "year_level"), at_step(attributes, DialogState.YEAR_LEVEL)))
+    attributes["year_level"] = "Third Year"
+    states.append(("handle_topic", intent_request("course registration"), at_step(attributes, DialogState.TOPIC)))
+    attributes["topic"] = "course registration"
+    question = f"how many credits can I take in term {question_id}"
+    states.append(("handle_question", intent_request(question), at_step(attributes, DialogState.QUESTION)))
+    # the job checked is for another question, so it does not fill the answer cache for the question turn
+    attributes["question"] = f"when can I drop a course in term {question_id}"
+    job_id = submit_job(question_params(attributes)) if submit_job else ""
+    states.append(("handle_check_answer", intent_request("check answer"), at_step(attributes, DialogState.CHECK_ANSWER, job_id = job_id)))
+    states.append(("handle_ask_another_question", intent_request("yes", "yes", "yes_no"), at_step(attributes, DialogState.ASK_ANOTHER_QUESTION)))
+    # a returning student confirming the profile saved by the dialog above
+    profile = {field: attributes[field] for field in PROFILE_FIELDS}
+    states.append(("handle_confirm_profile", intent_request("yes", "yes", "yes_no"), at_step(initial_attributes(profile), DialogState.CONFIRM_PROFILE)))
+    return states
+
+def load_envelopes(path):
+    with open(path) as envelope_file:
+        return [json.loads(line) for line in envelope_file if line.strip()]
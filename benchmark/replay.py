@@ -0,0 +1,230 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda")
+sys.path.insert(0, LAMBDA_DIR)
+
+import requests
+from ask_sdk_core.api_client import DefaultApiClient
+from ask_sdk_model.services import ApiClientResponse
+
+from envelopes import dialog_states, envelope, load_envelopes
+from stub_backend import StubBackend, build_catalog
+
+'''
+Replay benchmark
+    Replays Alexa request envelopes through voice_assistant.lambda_handler against a local stub backend, so the skill's
+    latency can be measured without an Alexa device or the real backend. By default one synthesized envelope per
+    dialog state of CatchAllIntentHandler is replayed per iteration; recorded envelopes can be replayed instead.
+
+    Reports p50/p95/p99 latency per handler branch, throughput, memory allocated per turn (peak traced memory,
+    measured in a separate pass so tracing does not distort the latency numbers), and how many of the backend requests
+    reused a pooled connection. With --baseline, the run fails when
+    the p95 of a branch regresses by more than --max-regression compared to a previous --output file.
+
+    Usage (from the repository root):
+        python benchmark/replay.py --iterations 200 --catalog-latency-ms 20 --specializations 300
+        python benchmark/replay.py --output bench.json
+        python benchmark/replay.py --baseline bench.json --max-regression 0.25
+        python benchmark/replay.py --envelopes recorded.jsonl
+        python benchmark/replay.py --stream --question-latency-ms 500 --chunk-latency-ms 300
+'''
+
+LAMBDA_TIMEOUT_MS = 30000
+
+class BenchmarkContext:
+    # Stand-in for the Lambda context object
+
+    def __init__(self, timeout_ms = LAMBDA_TIMEOUT_MS):
+        self.deadline = time.monotonic() + timeout_ms / 1000
+        self.function_name = "benchmark"
+        self.aws_request_id = "benchmark"
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self.deadline - time.monotonic()) * 1000))
+
+class LocalApiClient(DefaultApiClient):
+    # DefaultApiClient only talks to HTTPS endpoints; the stub directive service is plain HTTP on localhost
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def invoke(self, request):
+        headers = self._convert_list_tuples_to_dict(headers_list = request.headers)
+        body = json.dumps(request.body) if request.body else None
+        response = self.session.request(request.method, request.url, headers = headers, data = body)
+        return ApiClientResponse(headers = self._convert_dict_to_list_tuples(response.headers), status_code = response.status_code, body = response.text)
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def branch_name(event):
+    request = event["request"]
+    if request["type"] == "IntentRequest":
+        return "recorded:" + request["intent"]["name"]
+    return "recorded:" + request["type"]
+
+def build_turns(args, catalog, backend, iteration):
+    if args.envelopes:
+        turns = []
+        for event in load_envelopes(args.envelopes):
+            event["context"]["System"]["apiEndpoint"] = backend.url.rstrip("/")
+            turns.append((branch_name(event), event))
+        return turns
+    import answer_jobs
+    question_id = 0 if args.repeat_questions else iteration
+    return [
+        (branch, envelope(request, attributes, backend.url))
+        for branch, request, attributes in dialog_states(catalog, iteration, question_id, answer_jobs.submit_answer_job)
+    ]
+
+def reset_caches(skill_modules):
+    skill_modules["catalog"].invalidate_catalog()
+    skill_modules["directives"].directive_cache.invalidate()
+
+def replay(args, catalog, backend, skill_modules, iterations, on_turn):
+    for iteration in range(iterations):
+        for branch, event in build_turns(args, catalog, backend, iteration):
+            if args.cold_cache:
+                reset_caches(skill_modules)
+            on_turn(branch, event)
+
+def run(args):
+    catalog = build_catalog(args.faculties, args.programs, args.specializations)
+    backend = StubBackend(
+        catalog,
+        catalog_latency = args.catalog_latency_ms / 1000,
+        question_latency = args.question_latency_ms / 1000,
+        directive_latency = args.directive_latency_ms / 1000,
+        stream = args.stream,
+        chunk_latency = args.chunk_latency_ms / 1000,
+        snapshot = not args.no_snapshot,
+    ).start()
+    os.environ["BASE_URL"] = backend.url
+
+    import catalog as catalog_module
+    import directives
+    import metrics
+    import voice_assistant
+    if not args.show_metrics:
+        metrics.set_writer(lambda line: None)
+    skill_modules = {"catalog": catalog_module, "directives": directives}
+    voice_assistant.sb.api_client = LocalApiClient()
+
+    def call(event):
+        response = voice_assistant.lambda_handler(event, BenchmarkContext())
+        if "response" not in response:
+            raise RuntimeError(f"Skill returned an invalid response: {response}")
+        return response
+
+    replay(args, catalog, backend, skill_modules, args.warmup, lambda branch, event: call(event))
+
+    latencies = {}
+    def timed_turn(branch, event):
+        started = time.perf_counter()
+        call(event)
+        latencies.setdefault(branch, []).append((time.perf_counter() - started) * 1000)
+
+    gc.collect()
+    started = time.perf_counter()
+    replay(args, catalog, backend, skill_modules, args.iterations, timed_turn)
+    elapsed = time.perf_counter() - started
+
+    allocations = {}
+    def traced_turn(branch, event):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        call(event)
+        allocations.setdefault(branch, []).append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+
+    tracemalloc.start()
+    replay(args, catalog, backend, skill_modules, max(1, args.iterations // 10), traced_turn)
+    tracemalloc.stop()
+    backend.stop()
+
+    import http_client
+
+    turns = sum(len(samples) for samples in latencies.values())
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("baseline", "output")},
+        "turns": turns,
+        "throughput_per_s": round(turns / elapsed, 1),
+        "backend_requests": backend.request_counts,
+        "backend_connections": http_client.connection_stats(),
+        "branches": {
+            branch: {
+                "count": len(samples),
+                "p50_ms": round(percentile(samples, 0.50), 3),
+                "p95_ms": round(percentile(samples, 0.95), 3),
+                "p99_ms": round(percentile(samples, 0.99), 3),
+                "alloc_peak_kib": round(sum(allocations.get(branch, [0])) / len(allocations.get(branch, [0])), 1),
+            }
+            for branch, samples in latencies.items()
+        },
+    }
+
+def print_report(results):
+    print(f"{'branch':<32}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'alloc KiB':>11}")
+    for branch, stats in results["branches"].items():
+        print(f"{branch:<32}{stats['count']:>7}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}{stats['alloc_peak_kib']:>11.1f}")
+    print(f"\n{results['turns']} turns, {results['throughput_per_s']} turns/s")
+    print("backend requests: " + ", ".join(f"{endpoint or '/'}={count}" for endpoint, count in sorted(results["backend_requests"].items())))
+    connections = results["backend_connections"]
+    print(f"backend connections: {connections['connections']} opened for {connections['requests']} requests ({connections['reused']} reused)")
+
+def find_regressions(results, baseline, max_regression):
+    regressions = []
+    for branch, stats in results["branches"].items():
+        previous = baseline["branches"].get(branch)
+        if previous and stats["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{branch}: p95 {previous['p95_ms']:.3f} ms -> {stats['p95_ms']:.3f} ms")
+    return regressions
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description = "Replay Alexa requests through lambda_handler against a local stub backend.")
+    parser.add_argument("--iterations", type = int, default = 100, help = "number of replays of the dialog")
+    parser.add_argument("--warmup", type = int, default = 5, help = "replays run before measuring")
+    parser.add_argument("--faculties", type = int, default = 4)
+    parser.add_argument("--programs", type = int, default = 5, help = "programs per faculty")
+    parser.add_argument("--specializations", type = int, default = 30, help = "specializations per program")
+    parser.add_argument("--catalog-latency-ms", type = float, default = 0, help = "latency of the catalog endpoints")
+    parser.add_argument("--question-latency-ms", type = float, default = 0, help = "latency of the question endpoint")
+    parser.add_argument("--stream", action = "store_true", help = "stream answers from the question endpoint")
+    parser.add_argument("--chunk-latency-ms", type = float, default = 0, help = "time between streamed answer chunks")
+    parser.add_argument("--directive-latency-ms", type = float, default = 0, help = "latency of the Alexa directive service")
+    parser.add_argument("--no-snapshot", action = "store_true", help = "serve the catalog only through the per-level endpoints")
+    parser.add_argument("--cold-cache", action = "store_true", help = "drop the skill's catalog caches before every turn")
+    parser.add_argument("--repeat-questions", action = "store_true", help = "ask the same question every iteration")
+    parser.add_argument("--show-metrics", action = "store_true", help = "print the skill's metric log lines")
+    parser.add_argument("--envelopes", help = "replay recorded envelopes (JSON lines) instead of synthesized ones")
+    parser.add_argument("--output", help = "write the results as JSON to this file")
+    parser.add_argument("--baseline", help = "results file of a previous run to compare against")
+    parser.add_argument("--max-regression", type = float, default = 0.25, help = "allowed relative p95 increase per branch")
+    return parser.parse_args(argv)
+
+def main(argv = None):
+    args = parse_args(argv)
+    results = run(args)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent = 2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file), args.max_regression)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
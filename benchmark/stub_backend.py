@@ -0,0 +1,170 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+'''
+Stub backend
+    Local stand-in for the Student Advising Assistant backend and the Alexa directive service, used to replay skill
+    requests offline. The catalog is synthesized from the configured sizes and every endpoint sleeps for a configurable
+    latency before answering. The whole catalog is also served as one snapshot with an ETag (unless snapshot is
+    false, in which case the endpoint is missing), answering 304 when If-None-Match matches. With stream set, the question endpoint streams its answer as newline-delimited JSON
+    ({"text": chunk} per line, chunked transfer encoding) to clients that accept it, waiting chunk_latency between
+    chunks.
+
+    - build_catalog(faculties, programs, specializations, seed): returns {faculty: {program: [specialization]}}
+    - answer_text(params): the answer given to a question
+    - StubBackend(catalog, catalog_latency, question_latency, directive_latency, stream, chunk_latency, snapshot): HTTP
+      server on a free local port
+        - start() / stop(): runs the server on a background thread
+        - url: base URL of the backend endpoints (ends with "/")
+        - request_counts: number of requests served per endpoint
+'''
+
+WORDS = [
+    "applied", "biology", "chemistry", "computer", "data", "ecology", "economics", "engineering", "environmental",
+    "finance", "forestry", "genetics", "geography", "history", "linguistics", "management", "marine", "mathematics",
+    "microbiology", "music", "neuroscience", "nursing", "oceanography", "philosophy", "physics", "physiology",
+    "psychology", "science", "sociology", "statistics", "systems", "theatre",
+]
+
+def build_catalog(faculties = 4, programs = 5, specializations = 30, seed = 0):
+    rng = random.Random(seed)
+    catalog = {}
+    for faculty_id in range(faculties):
+        faculty = f"Faculty of {WORDS[faculty_id % len(WORDS)].title()} {faculty_id}"
+        catalog[faculty] = {}
+        for program_id in range(programs):
+            program = f"Bachelor of {WORDS[(faculty_id + program_id) % len(WORDS)].title()} {program_id}"
+            catalog[faculty][program] = [
+                f"{rng.choice(['Major', 'Honours', 'Combined Major'])} in {' '.join(word.title() for word in rng.sample(WORDS, 2))} {spec_id}"
+                for spec_id in range(specializations)
+            ]
+    return catalog
+
+STREAM_CONTENT_TYPE = "application/x-ndjson"
+WORDS_PER_CHUNK = 4
+
+def answer_text(params):
+    return (
+        f"Here is what I found about {params.get('topic', '')}. "
+        f"{params.get('question', '')} is covered in the academic calendar. "
+        f"Your faculty's advising office can help with anything the calendar does not cover."
+    )
+
+class StubBackend:
+
+    def __init__(self, catalog, catalog_latency = 0.0, question_latency = 0.0, directive_latency = 0.0, stream = False, chunk_latency = 0.0, snapshot = True):
+        self.catalog = catalog
+        self.snapshot = json.dumps(catalog).encode("utf-8") if snapshot else None
+        self.etag = '"%s"' % hashlib.sha1(self.snapshot).hexdigest() if snapshot else None
+        self.catalog_latency = catalog_latency
+        self.question_latency = question_latency
+        self.directive_latency = directive_latency
+        self.stream = stream
+        self.chunk_latency = chunk_latency
+        self.request_counts = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d/" % self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, endpoint):
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def _handler_class(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                endpoint = url.path.strip("/")
+                backend._count(endpoint)
+
+                if endpoint == "catalog" and backend.snapshot is not None:
+                    time.sleep(backend.catalog_latency)
+                    if self.headers.get("If-None-Match") == backend.etag:
+                        self.send_response(304)
+                        self.send_header("ETag", backend.etag)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                    else:
+                        self._send_json(backend.catalog, headers = {"ETag": backend.etag})
+                elif endpoint == "faculties":
+                    time.sleep(backend.catalog_latency)
+                    self._send_json(list(backend.catalog))
+                elif endpoint == "programs":
+                    time.sleep(backend.catalog_latency)
+                    self._send_json(list(backend.catalog.get(params.get("faculty"), {})))
+                elif endpoint == "specializations":
+                    time.sleep(backend.catalog_latency)
+                    self._send_json(backend.catalog.get(params.get("faculty"), {}).get(params.get("program"), []))
+                elif endpoint == "question":
+                    time.sleep(backend.question_latency)
+                    if backend.stream and STREAM_CONTENT_TYPE in self.headers.get("Accept", ""):
+                        self._send_stream(answer_text(params))
+                    else:
+                        self._send_json({"main_response": answer_text(params)})
+                else:
+                    self._send_json({"message": "not found"}, status = 404)
+
+            def do_POST(self):
+                # Alexa directive service (progressive responses)
+                backend._count(urlparse(self.path).path.strip("/"))
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(backend.directive_latency)
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _send_stream(self, text):
+                self.send_response(200)
+                self.send_header("Content-Type", STREAM_CONTENT_TYPE)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = text.split(" ")
+                for start in range(0, len(words), WORDS_PER_CHUNK):
+                    if start:
+                        time.sleep(backend.chunk_latency)
+                    chunk = " ".join(words[start:start + WORDS_PER_CHUNK])
+                    if start + WORDS_PER_CHUNK < len(words):
+                        chunk += " "
+                    line = (json.dumps({"text": chunk}) + "\n").encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send_json(self, body, status = 200, headers = None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
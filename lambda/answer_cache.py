@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import deadline
+import metrics
+from cache import TTLCache
+from config import get_boto_config
+from constants import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL
+
+'''
+Answer cache
+    Students in the same program keep asking the same questions, so answers are cached by advising context and
+    normalized question. Lookups go through an in-process tier first (warm container) and then through an optional
+    persistent tier shared by every container.
+
+    Persistent tiers (get(key) / put(key, answer, ttl)):
+    - SQLiteAnswerStore: local SQLite file, used offline or for a single box
+    - DynamoDBAnswerStore: table shared by the skill function and the answer worker function
+
+    - normalize_question(question): lower-cases the question, drops punctuation and collapses whitespace
+    - answer_cache_key(params): returns the cache key of the question request parameters
+    - get_cached_answer(params): returns the cached answer for the question request, or None on a miss
+    - cache_answer(params, answer, persist): caches an answer in the in-process tier and, if persist, in the
+      persistent tier
+    - configure_answer_cache(store): overrides the persistent tier picked from the environment
+    - answer_cache_stats(): returns the hit/miss counters of the in-process tier
+'''
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ["faculty", "program", "specialization", "year", "topic"]
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+class SQLiteAnswerStore:
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, check_same_thread = False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS answers (cache_key TEXT PRIMARY KEY, answer TEXT, expires_at REAL)")
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute("SELECT answer, expires_at FROM answers WHERE cache_key = ?", (key,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0]
+
+    def put(self, key, answer, ttl):
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?)", (key, answer, time.time() + ttl))
+            self._connection.commit()
+
+class DynamoDBAnswerStore:
+
+    def __init__(self, table_name):
+        import boto3
+        self.table = boto3.resource("dynamodb", config = get_boto_config()).Table(table_name)
+
+    def get(self, key):
+        item = self.table.get_item(Key = {"cache_key": key}).get("Item")
+        if item is None or item["expires_at"] <= time.time():
+            return None
+        return item["answer"]
+
+    def put(self, key, answer, ttl):
+        self.table.put_item(Item = {"cache_key": key, "answer": answer, "expires_at": int(time.time() + ttl)})
+
+def normalize_question(question):
+    return " ".join(PUNCTUATION.sub(" ", question.lower()).split())
+
+def answer_cache_key(params):
+    context = [" ".join(str(params.get(field, "")).lower().split()) for field in KEY_FIELDS]
+    context.append(normalize_question(params.get("question", "")))
+    return hashlib.sha256(json.dumps(context).encode("utf-8")).hexdigest()
+
+local_answers = TTLCache(maxsize = ANSWER_CACHE_SIZE, ttl = ANSWER_CACHE_TTL)
+
+_store = None
+_store_configured = False
+
+def get_answer_store():
+    global _store, _store_configured
+    if not _store_configured:
+        table_name = os.environ.get("ANSWER_CACHE_TABLE")
+        path = os.environ.get("ANSWER_CACHE_PATH")
+        if table_name:
+            _store = DynamoDBAnswerStore(table_name)
+        elif path:
+            _store = SQLiteAnswerStore(path)
+        _store_configured = True
+    return _store
+
+def configure_answer_cache(store = None):
+    global _store, _store_configured
+    _store = store
+    _store_configured = True
+    local_answers.invalidate()
+
+def get_cached_answer(params):
+    key = answer_cache_key(params)
+    answer = local_answers.get(key)
+    if answer is not None:
+        metrics.record("answer_cache_hit", 1, "Count")
+        return answer
+
+    store = get_answer_store()
+    if store is not None:
+        try:
+            with metrics.span("answer_cache.store_get"):
+                answer = deadline.call("answer_cache.store_get", store.get, key)
+        except Exception:
+            logger.warning("Answer cache lookup failed", exc_info = True)
+    if answer is None:
+        metrics.record("answer_cache_miss", 1, "Count")
+        return None
+    metrics.record("answer_cache_hit", 1, "Count")
+    local_answers.put(key, answer)
+    return answer
+
+def cache_answer(params, answer, persist = True):
+    if not answer:
+        return
+    key = answer_cache_key(params)
+    local_answers.put(key, answer)
+
+    store = get_answer_store()
+    if not persist or store is None:
+        return
+    try:
+        with metrics.span("answer_cache.store_put"):
+            store.put(key, answer, ANSWER_CACHE_TTL)
+    except Exception:
+        logger.warning("Answer cache write failed", exc_info = True)
+
+def answer_cache_stats():
+    return local_answers.stats()
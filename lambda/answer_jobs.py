@@ -0,0 +1,207 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import deadline
+import http_client
+import metrics
+from answer_cache import cache_answer, get_cached_answer
+from config import get_boto_config
+from constants import JobStatus
+
+'''
+Answer jobs
+    The question endpoint can take longer to answer than the skill function is allowed to run, so questions are
+    submitted as jobs. The skill stores the job id in the session and returns immediately; the job runs elsewhere
+    and writes its result to a result store that "check answer" reads from.
+
+    The answer is streamed from the backend when it supports it: the question endpoint then replies with
+    newline-delimited JSON (STREAM_CONTENT_TYPE), one {"text": chunk} object per generated chunk. While the job is
+    pending, its record holds the answer up to the last finished sentence, so the skill can speak those sentences
+    before the rest is generated. A plain JSON reply ({"main_response": ...}) is read as a single chunk.
+
+    Result stores (put(job_id, record) / get(job_id) / wait(job_id, record, timeout)):
+    - InMemoryJobStore: process-local store, used offline and when no table is configured
+    - DynamoDBJobStore: table shared by the skill function and the answer worker function
+
+    Job runners (submit(job_id, params)):
+    - ThreadJobRunner: runs the job on a local thread pool, writing to the given store
+    - LambdaJobRunner: asynchronously invokes the answer worker function with the job payload
+
+    - stream_answer(params): calls the question endpoint and yields the answer's text chunks as they arrive
+    - sentence_boundary(text, start): returns the length of the text up to the end of its last finished sentence
+      (searching from start)
+    - run_answer_job(store, job_id, params): answers the job from the answer cache, or runs it to completion,
+      recording the finished sentences while it runs and the result at the end, and adds the result to the cache
+    - submit_answer_job(params): records a pending job, hands it to the runner and returns the job id; the calls to the
+      result store on the request path are bounded by the invocation's deadline (see deadline.call)
+    - get_answer_job(job_id): returns the job record ({"status", "answer"}), or None if it is unknown; the answer of a
+      pending job holds the sentences finished so far
+    - wait_for_answer_job(job_id, job, timeout): waits (at most timeout seconds) for the job record to change from job
+      and returns the current record
+    - configure_jobs(store, runner): overrides the store/runner picked from the environment (e.g. for offline runs)
+    - worker_handler(event, context): entry point of the answer worker function
+'''
+
+ANSWER_JOB_KEY = "answer_job"
+ANSWER_JOB_WORKERS = int(os.environ.get("ANSWER_JOB_WORKERS", 4))
+STREAM_CONTENT_TYPE = "application/x-ndjson"
+
+# end of a sentence: punctuation (and closing quotes/brackets) followed by whitespace
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+
+class InMemoryJobStore:
+
+    def __init__(self):
+        self._jobs = {}
+        self._changed = threading.Condition()
+
+    def put(self, job_id, record):
+        with self._changed:
+            self._jobs[job_id] = dict(record)
+            self._changed.notify_all()
+
+    def get(self, job_id):
+        with self._changed:
+            record = self._jobs.get(job_id)
+            return dict(record) if record is not None else None
+
+    def wait(self, job_id, record, timeout):
+        with self._changed:
+            self._changed.wait_for(lambda: self._jobs.get(job_id) != record, timeout)
+        return self.get(job_id)
+
+class DynamoDBJobStore:
+
+    def __init__(self, table_name, ttl_seconds = 3600):
+        import boto3
+        self.table = boto3.resource("dynamodb", config = get_boto_config()).Table(table_name)
+        self.ttl_seconds = ttl_seconds
+
+    def put(self, job_id, record):
+        item = {"job_id": job_id, "expires_at": int(time.time()) + self.ttl_seconds}
+        item.update(record)
+        self.table.put_item(Item = item)
+
+    def get(self, job_id):
+        item = self.table.get_item(Key = {"job_id": job_id}, ConsistentRead = True).get("Item")
+        if item is None:
+            return None
+        return {"status": item["status"], "answer": item.get("answer", "")}
+
+    def wait(self, job_id, record, timeout):
+        # DynamoDB cannot notify the reader, so it is polled
+        time.sleep(timeout)
+        return self.get(job_id)
+
+class ThreadJobRunner:
+
+    def __init__(self, store, max_workers = ANSWER_JOB_WORKERS):
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = "answer-job")
+
+    def submit(self, job_id, params):
+        self.executor.submit(run_answer_job, self.store, job_id, params)
+
+class LambdaJobRunner:
+
+    def __init__(self, function_name):
+        import boto3
+        self.client = boto3.client("lambda", config = get_boto_config())
+        self.function_name = function_name
+
+    def submit(self, job_id, params):
+        payload = {ANSWER_JOB_KEY: {"job_id": job_id, "params": params}}
+        self.client.invoke(FunctionName = self.function_name, InvocationType = "Event", Payload = json.dumps(payload))
+
+def stream_answer(params):
+    response = http_client.get_stream("question", params, accept = STREAM_CONTENT_TYPE + ", application/json")
+    with response:
+        if not response.headers.get("Content-Type", "").startswith(STREAM_CONTENT_TYPE):
+            yield response.json()["main_response"] or ""
+            return
+        # chunk_size None hands over every chunk as soon as it arrives
+        for line in response.iter_lines(chunk_size = None):
+            if line.strip():
+                yield json.loads(line).get("text", "")
+
+def sentence_boundary(text, start = 0):
+    boundary = start
+    for match in SENTENCE_END.finditer(text, start):
+        boundary = match.end()
+    return boundary
+
+def run_answer_job(store, job_id, params):
+    # a job queued behind an identical question is answered from the cache
+    answer = get_cached_answer(params)
+    if answer is not None:
+        store.put(job_id, {"status": JobStatus.DONE.value, "answer": answer})
+        return
+
+    answer = ""
+    finished = 0
+    try:
+        for chunk in stream_answer(params):
+            answer += chunk
+            boundary = sentence_boundary(answer, finished)
+            if boundary > finished:
+                finished = boundary
+                store.put(job_id, {"status": JobStatus.PENDING.value, "answer": answer[:finished]})
+    except Exception:
+        store.put(job_id, {"status": JobStatus.FAILED.value, "answer": ""})
+        raise
+    cache_answer(params, answer)
+    store.put(job_id, {"status": JobStatus.DONE.value, "answer": answer})
+
+_store = None
+_runner = None
+
+def get_job_store():
+    global _store
+    if _store is None:
+        table_name = os.environ.get("ANSWER_JOB_TABLE")
+        _store = DynamoDBJobStore(table_name) if table_name else InMemoryJobStore()
+    return _store
+
+def get_job_runner():
+    global _runner
+    if _runner is None:
+        function_name = os.environ.get("ANSWER_WORKER_FUNCTION")
+        _runner = LambdaJobRunner(function_name) if function_name else ThreadJobRunner(get_job_store())
+    return _runner
+
+def configure_jobs(store = None, runner = None):
+    global _store, _runner
+    _store = store
+    _runner = runner
+
+def _submit_job(job_id, params):
+    get_job_store().put(job_id, {"status": JobStatus.PENDING.value, "answer": ""})
+    get_job_runner().submit(job_id, params)
+
+def submit_answer_job(params):
+    job_id = uuid.uuid4().hex
+    # the record and the invocation are bounded together, as botocore's timeouts apply to each of them separately
+    with metrics.span("answer_job.submit"):
+        deadline.call("answer_job.submit", _submit_job, job_id, params)
+    return job_id
+
+def get_answer_job(job_id):
+    with metrics.span("answer_job.get"):
+        return deadline.call("answer_job.get", get_job_store().get, job_id)
+
+def wait_for_answer_job(job_id, job, timeout):
+    return deadline.call("answer_job.wait", get_job_store().wait, job_id, job, timeout)
+
+def worker_handler(event, context):
+    job = event[ANSWER_JOB_KEY]
+    # the worker is not bound by Alexa's response time, only by its own timeout
+    deadline.start(context, budget = None)
+    try:
+        run_answer_job(get_job_store(), job["job_id"], job["params"])
+    finally:
+        deadline.clear()
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import metrics
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+'''
+Async HTTP
+    Transport for http_client that sends the backend requests with aiohttp on the skill server's event loop. The
+    handlers keep calling http_client from their worker threads; every call is handed to the event loop and the
+    calling thread waits for the response, within its own timeout.
+
+    Identical GET requests (same URL, parameters and headers) that are in flight at the same time are coalesced: only
+    the first one is sent and the others share its response. A streamed body is shared as well; every caller reads
+    it from the beginning, as it arrives.
+
+    aiohttp is an optional dependency, only needed by the skill server.
+
+    - AsyncTransport(loop, session): http_client transport sending requests with the aiohttp session on the loop
+        - get(url, params, timeout, headers, stream): returns an AsyncResponse; must not be called on the loop itself
+        - in_flight(): returns how many distinct requests are in flight
+    - AsyncResponse: the parts of the requests.Response API the skill uses (status_code, headers, raise_for_status,
+      json, text, content, iter_content, iter_lines, close), reading from the shared response
+'''
+
+class SharedResponse:
+    # written by the event loop, read by every caller of a coalesced request
+
+    def __init__(self, url):
+        self.url = url
+        self.status_code = None
+        self.headers = CaseInsensitiveDict()
+        self.error = None
+        self.chunks = []
+        self.done = False
+        self.started = threading.Event()
+        self.changed = threading.Condition()
+
+    def start(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.started.set()
+
+    def feed(self, chunk):
+        with self.changed:
+            self.chunks.append(chunk)
+            self.changed.notify_all()
+
+    def finish(self, error = None):
+        with self.changed:
+            self.error = error
+            self.done = True
+            self.changed.notify_all()
+        self.started.set()
+
+class AsyncResponse:
+
+    def __init__(self, shared, read_timeout = None):
+        self._shared = shared
+        self._read_timeout = read_timeout
+        self.url = shared.url
+        self.status_code = shared.status_code
+        self.headers = shared.headers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response = self)
+
+    def iter_content(self, chunk_size = None):
+        shared = self._shared
+        position = 0
+        while True:
+            with shared.changed:
+                if not shared.changed.wait_for(lambda: len(shared.chunks) > position or shared.done, self._read_timeout):
+                    raise requests.Timeout(f"Read timed out: {self.url}")
+                chunks = shared.chunks[position:]
+                done = shared.done
+                error = shared.error
+            position += len(chunks)
+            yield from chunks
+            if done and position == len(shared.chunks):
+                if error is not None:
+                    raise error
+                return
+
+    def iter_lines(self, chunk_size = None):
+        pending = b""
+        for chunk in self.iter_content(chunk_size):
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            yield from lines
+        if pending:
+            yield pending
+
+    @property
+    def content(self):
+        return b"".join(self.iter_content())
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+class AsyncTransport:
+
+    def __init__(self, loop, session):
+        if aiohttp is None:
+            raise RuntimeError("AsyncTransport requires aiohttp (pip install aiohttp)")
+        self.loop = loop
+        self.session = session
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
+
+    def get(self, url, params = None, timeout = None, headers = None, stream = False):
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        key = (url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())))
+        with self._lock:
+            shared = self._in_flight.get(key)
+            coalesced = shared is not None
+            if not coalesced:
+                shared = SharedResponse(url)
+                self._in_flight[key] = shared
+                asyncio.run_coroutine_threadsafe(self._fetch(key, shared, params, headers, connect, read), self.loop)
+        if coalesced:
+            metrics.record("backend.coalesced", 1, "Count")
+
+        wait = None if connect is None or read is None else connect + read
+        if not shared.started.wait(wait):
+            raise requests.Timeout(f"Timed out waiting for {url}")
+        if shared.status_code is None:
+            raise shared.error
+        return AsyncResponse(shared, read)
+
+    async def _fetch(self, key, shared, params, headers, connect, read):
+        try:
+            client_timeout = aiohttp.ClientTimeout(sock_connect = connect, sock_read = read)
+            async with self.session.get(shared.url, params = params, headers = headers, timeout = client_timeout) as response:
+                shared.start(response.status, response.headers)
+                async for chunk in response.content.iter_any():
+                    shared.feed(chunk)
+            shared.finish()
+        except asyncio.TimeoutError:
+            shared.finish(requests.Timeout(f"Timed out: {shared.url}"))
+        except aiohttp.ClientError as error:
+            shared.finish(requests.ConnectionError(f"{error}: {shared.url}"))
+        except Exception as error:
+            shared.finish(requests.RequestException(f"{error!r}: {shared.url}"))
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
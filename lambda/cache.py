@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+
+'''
+TTL cache
+    Module-level instances of TTLCache live for as long as the Lambda container is warm, so values cached by one
+    invocation are served to the next ones without going over the network.
+
+    - TTLCache(maxsize, ttl): thread-safe mapping whose entries expire after ttl seconds; when it holds more than
+      maxsize entries the least recently used one is evicted
+        - get(key): returns the cached value, or None on a miss (absent or expired)
+        - put(key, value): caches the value
+        - get_or_load(key, loader): returns the cached value, calling loader() and caching its result on a miss
+        - invalidate(key = None): drops the given key, or every entry when no key is given
+        - key in cache: true if the key holds an unexpired value (does not count as a hit or miss)
+        - stats(): returns the hit/miss/eviction counters and the current size
+'''
+
+class TTLCache:
+
+    def __init__(self, maxsize = 256, ttl = 3600, clock = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > self.clock()
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last = False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
@@ -0,0 +1,191 @@
+import logging
+import threading
+import time
+
+import requests
+
+import deadline
+import http_client
+import metrics
+import prefetch
+from cache import TTLCache
+from constants import CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL
+from spec_index import SpecializationIndex
+
+'''
+Catalog
+    The faculty / program / specialization catalog rarely changes, so it is loaded once per warm container as a
+    single snapshot of the whole tree from the "catalog" endpoint ({faculty: {program: [specialization]}}), and
+    every lookup is served from memory. Once the snapshot is older than CATALOG_CACHE_TTL it is revalidated with
+    If-None-Match against its ETag, which costs an empty 304 response when the catalog has not changed. When the
+    revalidation fails, or another thread is still loading it after PREFETCH_WAIT seconds, the stale snapshot keeps
+    being served; without a stale snapshot, the handler loads it itself.
+
+    A backend without the catalog endpoint (404) is served through the per-level endpoints (faculties, programs,
+    specializations) instead, whose responses are cached keyed by endpoint and request parameters.
+
+    - CatalogSnapshot(tree, etag): the catalog tree held as tuples, sharing repeated names
+    - get_snapshot(): returns the current catalog snapshot, loading or revalidating it when needed; None when the
+      backend has no catalog endpoint (or nothing could be loaded)
+    - prefetch_snapshot(): loads or revalidates the catalog snapshot in the background
+    - get_catalog(endpoint, params): returns the (possibly cached) JSON response of a catalog endpoint
+    - get_faculties(): returns the list of faculties
+    - get_programs(faculty): returns the programs offered by the given faculty
+    - get_specializations(faculty, program): returns the specializations of the given program
+    - get_specialization_index(faculty, program): returns the search index over the specializations of the program,
+      built once per (faculty, program) and cached alongside the catalog responses
+    - prefetch_catalog(endpoint, params): fetches the catalog snapshot (or, without it, the catalog response) in the
+      background unless it is already cached
+    - prefetch_specialization_index(faculty, program): fetches and indexes the specializations of a program in the
+      background; get_specializations / get_specialization_index wait for an in-flight prefetch instead of refetching
+    - invalidate_catalog(): drops the catalog snapshot and every cached catalog response
+    - catalog_cache_stats(): returns the hit/miss counters of the catalog cache
+'''
+
+logger = logging.getLogger(__name__)
+
+catalog_cache = TTLCache(maxsize = CATALOG_CACHE_SIZE, ttl = CATALOG_CACHE_TTL)
+spec_index_cache = TTLCache(maxsize = CATALOG_CACHE_SIZE, ttl = CATALOG_CACHE_TTL)
+
+SNAPSHOT_KEY = ("catalog", "snapshot")
+
+class CatalogSnapshot:
+    # names repeat across programs (e.g. the same major in several faculties), so each distinct name is stored once
+
+    __slots__ = ("faculties", "programs", "specializations", "etag")
+
+    def __init__(self, tree, etag = None):
+        names = {}
+        intern = lambda name: names.setdefault(name, name)
+        self.faculties = tuple(intern(faculty) for faculty in tree)
+        self.programs = {}
+        self.specializations = {}
+        for faculty, programs in tree.items():
+            faculty = intern(faculty)
+            self.programs[faculty] = tuple(intern(program) for program in programs)
+            for program, specializations in programs.items():
+                self.specializations[(faculty, intern(program))] = tuple(intern(spec) for spec in specializations)
+        self.etag = etag
+
+_snapshot = None
+_snapshot_validated = 0.0
+_snapshot_supported = True
+_snapshot_lock = threading.Lock()
+
+def _snapshot_fresh():
+    return _snapshot is not None and time.monotonic() - _snapshot_validated < CATALOG_CACHE_TTL
+
+def _load_snapshot(wait = None):
+    timeout = deadline.clip(wait)
+    if not _snapshot_lock.acquire(timeout = -1 if timeout is None else timeout):
+        if _snapshot is not None:
+            return _snapshot
+        # the thread holding the lock may be a prefetch frozen with the container in the middle of its request
+        return _revalidate_snapshot()
+    try:
+        return _revalidate_snapshot()
+    finally:
+        _snapshot_lock.release()
+
+def _revalidate_snapshot():
+    global _snapshot, _snapshot_validated, _snapshot_supported
+    if not _snapshot_supported or _snapshot_fresh():
+        return _snapshot
+    headers = {"If-None-Match": _snapshot.etag} if _snapshot is not None and _snapshot.etag else {}
+    try:
+        response = http_client.get("catalog", headers = headers)
+    except requests.HTTPError as error:
+        if error.response is not None and error.response.status_code == 404:
+            logger.info("The backend has no catalog endpoint, using the per-level catalog endpoints")
+            _snapshot_supported = False
+            return None
+        logger.warning("Could not load the catalog snapshot", exc_info = True)
+        return _snapshot
+    except requests.RequestException:
+        logger.warning("Could not load the catalog snapshot", exc_info = True)
+        return _snapshot
+
+    if response.status_code == 304:
+        metrics.record("catalog_snapshot_not_modified", 1, "Count")
+    else:
+        metrics.record("catalog_snapshot_load", 1, "Count")
+        if _snapshot is not None:
+            spec_index_cache.invalidate()
+        _snapshot = CatalogSnapshot(response.json(), response.headers.get("ETag"))
+    _snapshot_validated = time.monotonic()
+    return _snapshot
+
+def get_snapshot():
+    prefetch.wait_for(SNAPSHOT_KEY, deadline.clip(prefetch.PREFETCH_WAIT))
+    if _snapshot_fresh():
+        metrics.record("catalog_cache_hit", 1, "Count")
+        return _snapshot
+    return _load_snapshot(prefetch.PREFETCH_WAIT)
+
+def prefetch_snapshot():
+    if _snapshot_supported and not _snapshot_fresh():
+        prefetch.submit(SNAPSHOT_KEY, _load_snapshot)
+
+def catalog_key(endpoint, params):
+    return (endpoint, tuple(sorted(params.items())))
+
+def _load_catalog(endpoint, params):
+    return catalog_cache.get_or_load(catalog_key(endpoint, params), lambda: http_client.get_json(endpoint, params))
+
+def get_catalog(endpoint, params = None):
+    params = params or {}
+    key = catalog_key(endpoint, params)
+    prefetch.wait_for(("catalog", key), deadline.clip(prefetch.PREFETCH_WAIT))
+    metrics.record("catalog_cache_hit" if key in catalog_cache else "catalog_cache_miss", 1, "Count")
+    return _load_catalog(endpoint, params)
+
+def prefetch_catalog(endpoint, params = None):
+    if _snapshot_supported:
+        prefetch_snapshot()
+        return
+    params = params or {}
+    key = catalog_key(endpoint, params)
+    if key not in catalog_cache:
+        prefetch.submit(("catalog", key), lambda: _load_catalog(endpoint, params))
+
+def get_faculties():
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.faculties
+    return get_catalog("faculties")
+
+def get_programs(faculty):
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.programs.get(faculty, ())
+    return get_catalog("programs", {"faculty" : faculty})
+
+def get_specializations(faculty, program):
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.specializations.get((faculty, program), ())
+    return get_catalog("specializations", {"faculty" : faculty, "program" : program})
+
+def _load_specialization_index(faculty, program):
+    key = (faculty, program)
+    return spec_index_cache.get_or_load(key, lambda: SpecializationIndex(get_specializations(faculty, program)))
+
+def get_specialization_index(faculty, program):
+    prefetch.wait_for(("spec_index", faculty, program), deadline.clip(prefetch.PREFETCH_WAIT))
+    return _load_specialization_index(faculty, program)
+
+def prefetch_specialization_index(faculty, program):
+    if (faculty, program) not in spec_index_cache:
+        prefetch.submit(("spec_index", faculty, program), lambda: _load_specialization_index(faculty, program))
+
+def invalidate_catalog():
+    global _snapshot, _snapshot_validated, _snapshot_supported
+    with _snapshot_lock:
+        _snapshot = None
+        _snapshot_validated = 0.0
+        _snapshot_supported = True
+    catalog_cache.invalidate()
+    spec_index_cache.invalidate()
+
+def catalog_cache_stats():
+    return catalog_cache.stats()
@@ -0,0 +1,55 @@
+import threading
+import time
+
+'''
+Circuit breaker
+    Stops sending requests to a dependency that is clearly down, so every turn fails fast with a fallback prompt
+    instead of waiting for a timeout. After failure_threshold consecutive failures the circuit opens and calls are
+    refused; after reset_timeout seconds one trial call is let through, which closes the circuit again if it succeeds
+    and reopens it if it fails.
+
+    - CircuitBreaker(failure_threshold, reset_timeout): thread-safe breaker for one dependency
+        - allow(): returns true if a call may be sent now
+        - record_success() / record_failure(): reports the outcome of a call that was allowed
+        - state: "closed", "open" or "half-open"
+'''
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold = 5, reset_timeout = 30, clock = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if self._trial or self.clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial = False
@@ -0,0 +1,51 @@
+import os
+from functools import lru_cache
+
+import deadline
+import metrics
+
+'''
+Configuration
+    Settings are resolved lazily on first use and cached for the lifetime of the container, so importing the skill
+    does not touch the network. boto3 is only imported when a setting actually has to be read from SSM.
+
+    - get_setting(name, ssm_param_env, default): returns the setting from the environment variable `name`; if it is
+      not set, reads the SSM parameter whose name is stored in the environment variable `ssm_param_env`
+    - get_ssm_parameter(param_name): reads (and caches) a parameter from SSM Parameter Store
+    - get_base_url(): returns the base URL of the Student Advising Assistant backend (BASE_URL overrides it)
+    - get_boto_config(): returns the botocore client configuration: short timeouts and a single retry instead of
+      botocore's 60 second default. They apply to each attempt, so AWS calls on the request path are also bounded as a
+      whole by the invocation's deadline (see deadline.call)
+'''
+
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", 1))
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", 2))
+
+@lru_cache(maxsize = None)
+def get_boto_config():
+    from botocore.config import Config
+    return Config(connect_timeout = AWS_CONNECT_TIMEOUT, read_timeout = AWS_READ_TIMEOUT, retries = {"max_attempts": 2, "mode": "standard"})
+
+@lru_cache(maxsize = None)
+def get_ssm_parameter(param_name):
+    with metrics.span("ssm"):
+        import boto3
+        client = boto3.client("ssm", config = get_boto_config())
+        return deadline.call("ssm", client.get_parameter, Name = param_name)["Parameter"]["Value"]
+
+@lru_cache(maxsize = None)
+def get_setting(name, ssm_param_env = None, default = None):
+    value = os.environ.get(name)
+    if value:
+        return value
+    param_name = os.environ.get(ssm_param_env) if ssm_param_env else None
+    if param_name:
+        return get_ssm_parameter(param_name)
+    return default
+
+@lru_cache(maxsize = None)
+def get_base_url():
+    override = os.environ.get("BASE_URL")
+    if override:
+        return override
+    return "http://" + get_setting("BACKEND_HOST", "URL_PARAM")
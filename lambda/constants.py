@@ -1,27 +1,24 @@
-import boto3
 import os
 from ask_sdk_model.er.dynamic import Entity, EntityValueAndSynonyms
 from enum import Enum
 
-ssm = boto3.client("ssm")
-
 # ENUM DEFINITIONS
-class QuestionType(Enum):
+class QuestionType(str, Enum):
     GENERAL = "general"
     SPECIFIC = "specific"
 
-class YearLevel(Enum):
+class YearLevel(str, Enum):
     FIRST = "First Year"
     SECOND = "Second Year"
     THIRD = "Third Year"
     FOURTH = "Fourth Year"
     FIFTH = "Fifth Year"
 
-class YesNo(Enum):
+class YesNo(str, Enum):
     YES = "yes"
     NO = "no"
 
-class MessageType(Enum):
+class MessageType(str, Enum):
     SPEECH = "speech"
     REPROMPT = "reprompt"
     ASK_AGAIN = "ask again"
@@ -30,16 +27,42 @@ class MessageType(Enum):
     CONFIRM_SPEC = "confirm spec"
     PROGRESSIVE_RESPONSE = "progressive response"
     GREETINGS = "greetings"
+    WAITING = "waiting"
 
-class Status(Enum):
+class Status(str, Enum):
     EMPTY = ""
     NO_MATCH = "no match"
-    LOADED = "loaded"
-    WAITING = "waiting"
+
+# Steps of the CatchAllIntent dialog; new steps are appended, as the session encoding stores a step by its position
+class DialogState(str, Enum):
+    QUESTION_TYPE = "question type"
+    FACULTY = "faculty"
+    PROGRAM = "program"
+    LOAD_SPECIALIZATION = "load specialization"
+    SPECIALIZATION = "specialization"
+    YEAR_LEVEL = "year level"
+    TOPIC = "topic"
+    QUESTION = "question"
+    CHECK_ANSWER = "check answer"
+    ASK_ANOTHER_QUESTION = "ask another question"
+    CONFIRM_PROFILE = "confirm profile"
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
 
 # ARRTIBUTES & ENTITIES
-BASE_URL = "http://" + ssm.get_parameter(Name = os.environ.get("URL_PARAM"))["Parameter"]["Value"]
-ATTRIBUTES = ["question_type", "faculty", "program", "specialization", "year_level", "topic", "question", "answer", "ask_another_question"]
+CATALOG_CACHE_TTL = int(os.environ.get("CATALOG_CACHE_TTL", 3600))
+CATALOG_CACHE_SIZE = int(os.environ.get("CATALOG_CACHE_SIZE", 256))
+ANSWER_CACHE_TTL = int(os.environ.get("ANSWER_CACHE_TTL", 86400))
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", 512))
+# how long handle_question speaks the finished sentences of a streamed answer before asking the user to check back
+ANSWER_STREAM_WINDOW = float(os.environ.get("ANSWER_STREAM_WINDOW", 5))
+ANSWER_POLL_INTERVAL = float(os.environ.get("ANSWER_POLL_INTERVAL", 0.25))
+# Session attributes of the dialog; new attributes are appended and none are removed or reordered, as the session
+# encoding stores an attribute by its position (a retired attribute keeps its place)
+ATTRIBUTES = ["question_type", "faculty", "program", "specialization", "year_level", "topic", "question", "job_id", "spoken"]
 
 QUESTION_TYPE_ENTITIES = [
     Entity(name = EntityValueAndSynonyms(value = QuestionType.GENERAL, synonyms = ["general", "general question"])),
@@ -65,6 +88,14 @@ LAUNCH_MESSAGES = {
     MessageType.REPROMPT: "Please tell me what type of question you want to ask."
 }
 
+PROFILE_MESSAGES = {
+    MessageType.GREETINGS: "Welcome back to Student Advising Assistant!!",
+    MessageType.SPEECH: "Is that still right?",
+    MessageType.REPROMPT: "Please tell me if you are still in the same program.",
+    MessageType.ASK_AGAIN: "Sorry, I didn't get that. Please answer either yes or no.",
+    MessageType.FIRST_QUESTION: "OK. Let's start over. Do you want to ask a general question or program-specific question?"
+}
+
 QUESTION_TYPE_MESSAGES = {
     MessageType.FIRST_QUESTION: "OK. Now please tell me your faculty.",
     MessageType.FIRST_SPECIFIC_QUESTION: "OK. Please tell me your field of study.",
@@ -107,16 +138,22 @@ TOPIC_MESSAGES = {
 
 CHECK_ANS_MESSAGES = {
     MessageType.ASK_AGAIN: "Sorry, I could not find any answer for your question.",
+    MessageType.WAITING: "Your answer is still being generated. Please ask 'check answer' again in a moment.",
     MessageType.SPEECH: "<break time='3s' /> Do you want to ask another question?"
 }
 
 QUESTION_MESSAGES = {
-    MessageType.PROGRESSIVE_RESPONSE: "Your question has been recorded. Please wait a moment while I generate the answer. <break time='10s' /> The answer is ready. Please ask 'Alexa, check answer.' to check the answer.",
-    MessageType.SPEECH: "Your answer is ready. Please ask 'check answer.' to check your answer."
+    MessageType.PROGRESSIVE_RESPONSE: "Your question has been recorded. Please wait a moment while I generate the answer.",
+    MessageType.SPEECH: "I am working on your answer. Please ask 'check answer' in a few seconds to hear it.",
+    MessageType.WAITING: "I am still working on the rest of your answer. Please ask 'check answer' in a few seconds to hear it."
 }
 
 ASK_ANOTHER_Q_MESSAGES = {
     MessageType.GREETINGS: "Thank you for using the Student Advising Assistant. Goodbye!",
     MessageType.ASK_AGAIN: "Sorry, I didn't get that. Please answer either yes or no.",
     MessageType.SPEECH: "Great!! Please tell me if you want to ask a general question or a program specific question."
+}
+
+FALLBACK_MESSAGES = {
+    MessageType.ASK_AGAIN: "Sorry, I could not reach the advising service just now. Please say that again."
 }
\ No newline at end of file
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+
+'''
+Deadline
+    Alexa waits about 8 seconds for a response and the function stops at its timeout; a response that comes later is
+    lost and the user hears an error. Every invocation therefore gets a deadline: the function's remaining time minus
+    DEADLINE_MARGIN (kept for building the response), capped at RESPONSE_BUDGET for skill requests. Outbound calls
+    on the request path take their timeouts from what is left of it, so a slow dependency ends in a fallback prompt
+    instead of a timeout.
+
+    Clients whose timeouts cannot follow the deadline (botocore, with fixed timeouts and retries per client, and the
+    ASK directive service, without any timeout) are called through call(): the call runs on a small thread pool and
+    the invocation only waits for it as long as the deadline allows. A call given up on keeps running in the
+    background until its client's own timeouts end it.
+
+    The deadline belongs to the thread handling the invocation; background threads (prefetches, local answer jobs)
+    have none and use their own timeouts.
+
+    - DeadlineExceeded: raised when the budget is spent before an outbound call (a requests.Timeout)
+    - start(context, budget): sets the deadline of the current invocation; context may be None (e.g. offline runs)
+    - clear(): removes the deadline of the current thread
+    - remaining(): returns the seconds left, or None when there is no deadline
+    - clip(seconds): returns seconds limited to the time left (the time left when seconds is None; None when there
+      is neither)
+    - check(name, minimum): raises DeadlineExceeded when less than minimum seconds are left for the call `name`
+    - call(name, function, *args, **kwargs): returns function(*args, **kwargs), raising DeadlineExceeded when it does
+      not finish before the deadline; without a deadline the function runs directly
+'''
+
+RESPONSE_BUDGET = float(os.environ.get("RESPONSE_BUDGET", 7))
+DEADLINE_MARGIN = float(os.environ.get("DEADLINE_MARGIN", 0.5))
+MIN_CALL_TIME = 0.05
+BOUNDED_CALL_WORKERS = int(os.environ.get("BOUNDED_CALL_WORKERS", 8))
+
+_local = threading.local()
+
+# runs the calls bounded by call(); its threads have no deadline of their own
+executor = ThreadPoolExecutor(max_workers = BOUNDED_CALL_WORKERS, thread_name_prefix = "deadline")
+
+class DeadlineExceeded(requests.Timeout):
+    pass
+
+def start(context = None, budget = RESPONSE_BUDGET):
+    seconds = budget
+    if context is not None:
+        left = context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN
+        seconds = left if seconds is None else min(seconds, left)
+    _local.deadline = time.monotonic() + seconds if seconds is not None else None
+
+def clear():
+    _local.deadline = None
+
+def remaining():
+    deadline = getattr(_local, "deadline", None)
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+def clip(seconds = None):
+    left = remaining()
+    if left is None:
+        return seconds
+    return left if seconds is None else min(seconds, left)
+
+def check(name, minimum = MIN_CALL_TIME):
+    left = remaining()
+    if left is not None and left < minimum:
+        raise DeadlineExceeded(f"No time left for {name}")
+
+def call(name, function, *args, **kwargs):
+    check(name)
+    left = remaining()
+    if left is None:
+        return function(*args, **kwargs)
+    future = executor.submit(function, *args, **kwargs)
+    done, _ = wait([future], timeout = left)
+    if not done:
+        raise DeadlineExceeded(f"{name} did not finish before the deadline")
+    return future.result()
@@ -0,0 +1,104 @@
+from constants import *
+
+'''
+Dialog
+    The CatchAllIntent dialog is a state machine. The current step is stored explicitly in the session attribute
+    "dialog_state"; DIALOG_HANDLERS maps it to the CatchAllIntentHandler method that processes it and TRANSITIONS to
+    the step that follows it once it is answered. Steps whose information is already known (e.g. the faculty when the
+    user asks another question) are skipped when advancing, so a new step is a new row in these tables rather than
+    another branch in the handler.
+
+    Session attributes travel in the envelope packed as one positional list, {"d": [state, question_type, faculty,
+    ...]} in the order of ATTRIBUTES, with the state as its position in DialogState and trailing empty values dropped.
+    Both are append only: reordering or removing an entry would decode every live session into the wrong fields.
+
+    - initial_attributes(profile): returns session attributes at the first dialog step; with a saved user profile,
+      they hold its values and the dialog starts by confirming them
+    - get_dialog_state(attributes): returns the current dialog step
+    - set_dialog_state(attributes, state): moves to the given dialog step
+    - advance(attributes): moves to the next dialog step that still needs input and returns it
+    - encode_session(attributes): packs session attributes for the response envelope
+    - decode_session(encoded): unpacks the session attributes of a request envelope
+'''
+
+DIALOG_STATE = "dialog_state"
+SESSION_KEY = "d"
+
+DIALOG_HANDLERS = {
+    DialogState.QUESTION_TYPE: "handle_question_type",
+    DialogState.FACULTY: "handle_faculty",
+    DialogState.PROGRAM: "handle_program",
+    DialogState.LOAD_SPECIALIZATION: "load_specialization",
+    DialogState.SPECIALIZATION: "handle_specialization",
+    DialogState.YEAR_LEVEL: "handle_year_level",
+    DialogState.TOPIC: "handle_topic",
+    DialogState.QUESTION: "handle_question",
+    DialogState.CHECK_ANSWER: "handle_check_answer",
+    DialogState.ASK_ANOTHER_QUESTION: "handle_ask_another_question",
+    DialogState.CONFIRM_PROFILE: "handle_confirm_profile",
+}
+
+TRANSITIONS = {
+    DialogState.QUESTION_TYPE: DialogState.FACULTY,
+    DialogState.FACULTY: DialogState.PROGRAM,
+    DialogState.PROGRAM: DialogState.LOAD_SPECIALIZATION,
+    DialogState.LOAD_SPECIALIZATION: DialogState.YEAR_LEVEL,
+    DialogState.SPECIALIZATION: DialogState.YEAR_LEVEL,
+    DialogState.YEAR_LEVEL: DialogState.TOPIC,
+    DialogState.TOPIC: DialogState.QUESTION,
+    DialogState.QUESTION: DialogState.CHECK_ANSWER,
+    DialogState.CHECK_ANSWER: DialogState.ASK_ANOTHER_QUESTION,
+    DialogState.ASK_ANOTHER_QUESTION: DialogState.QUESTION_TYPE,
+    DialogState.CONFIRM_PROFILE: DialogState.QUESTION_TYPE,
+}
+
+def _is_specific(attributes):
+    return attributes["question_type"] == QuestionType.SPECIFIC
+
+# Steps that are skipped when their information is already known; the other steps always need input
+NEEDS_INPUT = {
+    DialogState.FACULTY: lambda attributes: attributes["faculty"] == Status.EMPTY,
+    DialogState.PROGRAM: lambda attributes: attributes["program"] == Status.EMPTY,
+    DialogState.LOAD_SPECIALIZATION: lambda attributes: _is_specific(attributes) and attributes["specialization"] == Status.EMPTY,
+    DialogState.YEAR_LEVEL: lambda attributes: _is_specific(attributes) and attributes["year_level"] == Status.EMPTY,
+    DialogState.TOPIC: lambda attributes: attributes["topic"] == Status.EMPTY,
+}
+
+STATES = list(DialogState)
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+def initial_attributes(profile = None):
+    attributes = {attribute: Status.EMPTY for attribute in ATTRIBUTES}
+    attributes[DIALOG_STATE] = DialogState.QUESTION_TYPE
+    if profile:
+        attributes.update(profile)
+        attributes[DIALOG_STATE] = DialogState.CONFIRM_PROFILE
+    return attributes
+
+def get_dialog_state(attributes):
+    return attributes[DIALOG_STATE]
+
+def set_dialog_state(attributes, state):
+    attributes[DIALOG_STATE] = state
+
+def advance(attributes):
+    state = TRANSITIONS[attributes[DIALOG_STATE]]
+    while state in NEEDS_INPUT and not NEEDS_INPUT[state](attributes):
+        state = TRANSITIONS[state]
+    attributes[DIALOG_STATE] = state
+    return state
+
+def encode_session(attributes):
+    values = [STATE_CODES[attributes[DIALOG_STATE]]] + [attributes[attribute] for attribute in ATTRIBUTES]
+    while values[-1] == Status.EMPTY:
+        values.pop()
+    return {SESSION_KEY: values}
+
+def decode_session(encoded):
+    attributes = initial_attributes()
+    values = (encoded or {}).get(SESSION_KEY)
+    if not values:
+        return attributes
+    attributes[DIALOG_STATE] = STATES[values[0]]
+    attributes.update(zip(ATTRIBUTES, values[1:]))
+    return attributes
@@ -0,0 +1,130 @@
+import logging
+import re
+
+from ask_sdk_model.dialog import DynamicEntitiesDirective
+from ask_sdk_model.er.dynamic import UpdateBehavior, EntityListItem, Entity, EntityValueAndSynonyms
+
+import metrics
+from cache import TTLCache
+from constants import CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL, QUESTION_TYPE_ENTITIES, YEAR_LEVEL_ENTITIES, YES_NO_ENTITIES
+from entity_budget import entity_size, fit_budget, rank_by_use
+from spec_index import normalize
+
+'''
+Dynamic entity directives
+    Most of what the student can answer is known before the skill is deployed: the question types, the year levels,
+    yes/no and the faculties are static values of the CATCHALL slot type in the interaction model (written by
+    scripts/generate_interaction_model.py). Only the lists that depend on the previous answers, the programs of the
+    faculty and the specializations matching the spoken input, are sent as dynamic entities; so are the faculties of
+    the catalog when a spoken faculty matches none of the static values (the model may predate the catalog).
+
+    Every entity id starts with its kind ("faculty:faculty_of_science"), static or dynamic, so a step only accepts
+    values of the kind it asks for (see get_canonical_value in voice_assistant.py).
+
+    Dynamic entity lists are ranked and cut to the entity budget (see entity_budget.py); the number of entities
+    left out and the size of the directive are recorded as entity_budget.<kind>.trimmed and entity_budget.<kind>.bytes.
+
+    Entity lists are built once and reused: catalog entity lists are cached per catalog version (the list of values
+    they were built from), so the ranking by use of a list is refreshed when its cache entry expires. Adding a directive to a response also coalesces it with the directives already added for
+    the same slot, so a response never carries a CLEAR that is immediately overridden by a REPLACE, or the same
+    update twice.
+
+    - entity_id(kind, value): returns the id of the entity of the given kind for the value
+    - entity_kind(value_id): returns the kind of an entity id (None for values without a kind, e.g. the CATCHALL fillers)
+    - build_entity(kind, value): builds the entity of the given kind for a value, with its synonyms
+    - STATIC_ENTITIES: the entities of the static kinds that do not come from the catalog, with their ids
+    - build_replace_directive(entities, slot_name): builds a REPLACE directive for the given entities
+    - get_catalog_directive(kind, values, slot_name, ranked): returns the (cached) REPLACE directive for a catalog
+      entity list, within the entity budget; kind is one of DYNAMIC_KINDS (or faculty), and ranked tells that the
+      values are already in order of relevance (otherwise they are ranked by use)
+    - replace_dynamic_entities(handler_input, directive): adds a REPLACE directive to the response
+    - clear_dynamic_entities(handler_input, slot_name): adds a CLEAR directive for the slot to the response
+'''
+
+ID_WORDS = re.compile("[a-z0-9]+")
+
+def entity_id(kind, value):
+    return kind + ":" + "_".join(ID_WORDS.findall(value.lower()))
+
+def entity_kind(value_id):
+    kind, separator, _ = (value_id or "").partition(":")
+    return kind if separator else None
+
+def build_replace_directive(entities, slot_name = "CATCHALL"):
+    return DynamicEntitiesDirective(
+            update_behavior = UpdateBehavior.REPLACE,
+            types = [EntityListItem(name = slot_name, values = entities)]
+        )
+
+def faculty_synonyms(faculty):
+    name = faculty.lower().replace('the ', '')
+    # students usually name the faculty without its title ("science" for the Faculty of Science)
+    return [faculty.lower(), name, name.replace('faculty of ', '')]
+
+def specialization_synonyms(spec):
+    return [normalize(spec)]
+
+STATIC_KINDS = ("question_type", "faculty", "year_level", "yes_no")
+DYNAMIC_KINDS = ("program", "specialization")
+
+SYNONYMS = {
+    "faculty": faculty_synonyms,
+    "specialization": specialization_synonyms,
+}
+
+def build_entity(kind, value):
+    synonyms = SYNONYMS[kind](value) if kind in SYNONYMS else None
+    return Entity(id = entity_id(kind, value), name = EntityValueAndSynonyms(value = value, synonyms = synonyms))
+
+def _with_ids(kind, entities):
+    return [Entity(id = entity_id(kind, entity.name.value), name = entity.name) for entity in entities]
+
+# Entities known before deployment, by kind (the faculties come from the catalog)
+STATIC_ENTITIES = {
+    "question_type": _with_ids("question_type", QUESTION_TYPE_ENTITIES),
+    "year_level": _with_ids("year_level", YEAR_LEVEL_ENTITIES),
+    "yes_no": _with_ids("yes_no", YES_NO_ENTITIES),
+}
+
+logger = logging.getLogger(__name__)
+
+directive_cache = TTLCache(maxsize = CATALOG_CACHE_SIZE, ttl = CATALOG_CACHE_TTL)
+
+def _build_catalog_directive(kind, values, slot_name, ranked):
+    entities = [build_entity(kind, value) for value in (values if ranked else rank_by_use(kind, values))]
+    kept, trimmed = fit_budget(entities, overhead = entity_size(build_replace_directive([], slot_name)))
+    if trimmed:
+        logger.info("Sending %d of %d %s entities; left out: %s", len(kept), len(entities), kind, ", ".join(entity.name.value for entity in trimmed[:5]) + (", ..." if len(trimmed) > 5 else ""))
+    directive = build_replace_directive(kept, slot_name)
+    return directive, len(trimmed), entity_size(directive)
+
+def get_catalog_directive(kind, values, slot_name = "CATCHALL", ranked = False):
+    key = (slot_name, kind, tuple(values), ranked)
+    directive, trimmed, size = directive_cache.get_or_load(key, lambda: _build_catalog_directive(kind, values, slot_name, ranked))
+    metrics.record(f"entity_budget.{kind}.trimmed", trimmed, "Count")
+    metrics.record(f"entity_budget.{kind}.bytes", size, "Bytes")
+    return directive
+
+def _slot_directives(response, slot_name):
+    return [
+        directive for directive in response.directives or []
+        if isinstance(directive, DynamicEntitiesDirective) and directive.types and directive.types[0].name == slot_name
+    ]
+
+def _remove_directives(response, directives):
+    if not directives:
+        return
+    response.directives = [directive for directive in response.directives if all(directive is not other for other in directives)]
+
+def replace_dynamic_entities(handler_input, directive):
+    rb = handler_input.response_builder
+    _remove_directives(rb.response, _slot_directives(rb.response, directive.types[0].name))
+    rb.add_directive(directive)
+
+def clear_dynamic_entities(handler_input, slot_name = "CATCHALL"):
+    rb = handler_input.response_builder
+    existing = _slot_directives(rb.response, slot_name)
+    if any(directive.update_behavior == UpdateBehavior.CLEAR for directive in existing):
+        return
+    _remove_directives(rb.response, existing)
+    rb.add_directive(DynamicEntitiesDirective(update_behavior = UpdateBehavior.CLEAR, types = [EntityListItem(name = slot_name)]))
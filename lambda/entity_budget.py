@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+from collections import Counter
+
+from ask_sdk_core.serialize import DefaultSerializer
+
+'''
+Entity budget
+    The programs of a large faculty, or the specializations matching a short spoken fragment, can run into the
+    hundreds. Sending all of them as dynamic entities bloats every response of that step and can exceed what Alexa
+    accepts in one directive, so a dynamic entity list is ranked and only its head is sent: at most
+    ENTITY_BUDGET_COUNT entities, whose serialized size stays within ENTITY_BUDGET_BYTES.
+
+    Lists without a relevance order of their own (the programs of a faculty) are ranked by use: the values students
+    picked before in this container come first, the others keep the catalog order. Lists that are already ranked
+    (search results, best match first) keep their order.
+
+    - entity_size(entity): returns the size in bytes of the entity serialized as JSON
+    - record_use(kind, value): counts a value a student picked, for ranking the lists of that kind
+    - rank_by_use(kind, values): returns the values most-used first (stable)
+    - fit_budget(entities, max_count, max_bytes, overhead): returns (kept, trimmed), splitting the ranked entities at
+      the first one that no longer fits the budget; overhead is the size of the directive without entities
+    - usage_stats(kind): returns the use counts recorded for the kind
+'''
+
+ENTITY_BUDGET_COUNT = int(os.environ.get("ENTITY_BUDGET_COUNT", 100))
+ENTITY_BUDGET_BYTES = int(os.environ.get("ENTITY_BUDGET_BYTES", 16384))
+
+serializer = DefaultSerializer()
+
+_uses = {}
+_lock = threading.Lock()
+
+def entity_size(entity):
+    return len(json.dumps(serializer.serialize(entity), separators = (",", ":")).encode("utf-8"))
+
+def record_use(kind, value):
+    with _lock:
+        _uses.setdefault(kind, Counter())[value] += 1
+
+def usage_stats(kind):
+    with _lock:
+        return dict(_uses.get(kind, {}))
+
+def rank_by_use(kind, values):
+    uses = usage_stats(kind)
+    if not uses:
+        return list(values)
+    return sorted(values, key = lambda value: -uses.get(value, 0))
+
+def fit_budget(entities, max_count = ENTITY_BUDGET_COUNT, max_bytes = ENTITY_BUDGET_BYTES, overhead = 0):
+    size = overhead
+    for position, entity in enumerate(entities):
+        # entities are separated by a comma in the serialized list
+        size += entity_size(entity) + (1 if position else 0)
+        if position >= max_count or size > max_bytes:
+            return list(entities[:position]), list(entities[position:])
+    return list(entities), []
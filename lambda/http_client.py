@@ -0,0 +1,164 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+import deadline
+import metrics
+from circuit_breaker import CircuitBreaker
+from config import get_base_url
+
+'''
+HTTP client
+    Every call to the Student Advising Assistant backend goes through one shared requests.Session. The session is
+    created at module level, so its keep-alive connections are reused by every warm invocation of the container.
+
+    Transient failures (connection errors, dropped keep-alive connections, 502/503/504) are retried a bounded number
+    of times with exponential backoff, and every endpoint has its own (connect, read) timeout. A question is not
+    sent again after a read timeout: the backend may still be generating its answer, and a second attempt would
+    double the time the answer worker waits (ENDPOINT_RETRIES). During an invocation
+    the timeouts are also limited to the invocation's deadline, shared between the attempts the endpoint's retries
+    allow: the connect timeout between its connect attempts, the read timeout between its read attempts.
+
+    Backend failures (connection errors, timeouts, 5xx) are counted by a circuit breaker; once the backend is clearly
+    down, calls fail right away with BackendUnavailable until a trial call gets through again.
+
+    Requests are sent by a transport: RequestsTransport (the shared session) by default, or another object with the
+    same get method, e.g. the aiohttp transport of the skill server (see async_http.py).
+
+    - BackendUnavailable: raised instead of sending a request while the circuit is open (a requests.ConnectionError)
+    - RequestsTransport: sends requests with the shared requests.Session
+        - get(url, params, timeout, **kwargs): sends a GET request and returns the requests.Response
+    - set_transport(transport): replaces the transport (None restores RequestsTransport)
+
+    - get(endpoint, params): sends a GET request to the backend endpoint and returns the response
+    - get_json(endpoint, params): sends a GET request and returns the decoded JSON body
+    - get_stream(endpoint, params, accept): sends a GET request and returns the response without reading its body, so
+      the body can be consumed as it arrives (the caller closes the response)
+    - get_timeout(endpoint): returns the (connect, read) timeout used for the endpoint, within the deadline
+    - get_attempts(endpoint): returns how many (connect, read) attempts a call to the endpoint may make
+    - connection_stats(): returns how many requests were sent and how many of them reused a pooled connection
+'''
+
+DEFAULT_TIMEOUT = (3.05, 10)
+ENDPOINT_TIMEOUTS = {
+    "faculties": (3.05, 5),
+    "programs": (3.05, 5),
+    "specializations": (3.05, 5),
+    "catalog": (3.05, 10),
+    "question": (3.05, 180),
+}
+
+RETRY = Retry(
+    total = 2,
+    connect = 2,
+    read = 1,
+    status = 2,
+    backoff_factor = 0.1,
+    status_forcelist = [502, 503, 504],
+    allowed_methods = ["GET"],
+    raise_on_status = False,
+)
+
+# endpoints whose retries differ from RETRY
+ENDPOINT_RETRIES = {
+    "question": RETRY.new(read = 0),
+}
+
+POOL_MAXSIZE = 10
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get("CIRCUIT_RESET_TIMEOUT", 30))
+
+breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+
+class BackendUnavailable(requests.ConnectionError):
+    pass
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections = 1, pool_maxsize = POOL_MAXSIZE, max_retries = RETRY)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                # the longest matching prefix wins, so these adapters take the calls to their endpoint
+                for endpoint, retry in ENDPOINT_RETRIES.items():
+                    session.mount(get_base_url() + endpoint, HTTPAdapter(pool_connections = 1, pool_maxsize = POOL_MAXSIZE, max_retries = retry))
+                _session = session
+    return _session
+
+class RequestsTransport:
+
+    def get(self, url, params = None, timeout = None, **kwargs):
+        return get_session().get(url, params = params, timeout = timeout, **kwargs)
+
+_default_transport = RequestsTransport()
+_transport = None
+
+def set_transport(transport):
+    global _transport
+    _transport = transport
+
+def get_transport():
+    return _transport or _default_transport
+
+def _attempts(retries, total):
+    # None means the kind of error is only limited by the total
+    return (total if retries is None else min(retries, total)) + 1
+
+def get_attempts(endpoint):
+    retry = ENDPOINT_RETRIES.get(endpoint, RETRY)
+    return (_attempts(retry.connect, retry.total), _attempts(retry.read, retry.total))
+
+def get_timeout(endpoint):
+    connect, read = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+    left = deadline.remaining()
+    if left is None:
+        return (connect, read)
+    deadline.check("backend." + endpoint)
+    connect_attempts, read_attempts = get_attempts(endpoint)
+    return (min(connect, left / connect_attempts), min(read, left / read_attempts))
+
+def get(endpoint, params = None, **kwargs):
+    base_url = get_base_url()
+    timeout = get_timeout(endpoint)
+    if not breaker.allow():
+        metrics.record("backend.circuit_open", 1, "Count")
+        raise BackendUnavailable(f"The backend is unavailable, not calling {endpoint}")
+    try:
+        with metrics.span("backend." + endpoint):
+            response = get_transport().get(base_url + endpoint, params = params, timeout = timeout, **kwargs)
+    except requests.RequestException:
+        breaker.record_failure()
+        raise
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    response.raise_for_status()
+    return response
+
+def get_json(endpoint, params = None):
+    return get(endpoint, params).json()
+
+def get_stream(endpoint, params = None, accept = "application/json"):
+    return get(endpoint, params, stream = True, headers = {"Accept": accept})
+
+def connection_stats():
+    session = get_session()
+    pools = []
+    for adapter in {id(adapter): adapter for adapter in session.adapters.values()}.values():
+        pool_manager = adapter.poolmanager
+        pools.extend(pool_manager.pools[key] for key in pool_manager.pools.keys())
+
+    requests_sent = sum(pool.num_requests for pool in pools)
+    connections = sum(pool.num_connections for pool in pools)
+    return {"requests": requests_sent, "connections": connections, "reused": requests_sent - connections}
@@ -0,0 +1,100 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+'''
+Metrics
+    Latency of every handler branch and outbound call is recorded as spans and emitted once per invocation as a
+    CloudWatch Embedded Metric Format (EMF) log line, so CloudWatch turns it into metrics without any API call.
+    Invocations are sampled with METRICS_SAMPLE_RATE (0 to 1, default 1); when an invocation is not sampled, or
+    outside an invocation (e.g. on background threads), recording is a no-op.
+
+    - start_invocation(): starts recording the current invocation (if it is sampled); its total duration is recorded
+      as the metric "invocation"
+    - span(name): context manager timing the enclosed block as the metric `name` (milliseconds)
+    - record(name, value, unit): records a metric value directly (e.g. a duration measured on another thread)
+    - set_property(key, value): attaches a property to the invocation's log line (e.g. dialog state, cache hit/miss)
+    - set_dimension(key, value): attaches a property that is also used as the metrics' dimension
+    - flush(): emits the invocation's metrics as one EMF log line and stops recording
+    - set_writer(write): replaces the function the log lines are written with (stdout by default)
+'''
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "StudentAdvisingVoiceAssistant")
+METRICS_SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", 1))
+
+_local = threading.local()
+_write = None
+
+class InvocationMetrics:
+
+    def __init__(self):
+        self.values = {}
+        self.units = {}
+        self.properties = {}
+        self.dimensions = []
+        self.started = time.perf_counter()
+
+def _current():
+    return getattr(_local, "metrics", None)
+
+def start_invocation():
+    _local.metrics = InvocationMetrics() if random.random() < METRICS_SAMPLE_RATE else None
+
+@contextmanager
+def span(name):
+    metrics = _current()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - started) * 1000)
+
+def record(name, value, unit = "Milliseconds"):
+    metrics = _current()
+    if metrics is None or value is None:
+        return
+    metrics.values[name] = round(metrics.values.get(name, 0) + value, 3)
+    metrics.units[name] = unit
+
+def set_property(key, value):
+    metrics = _current()
+    if metrics is not None:
+        metrics.properties[key] = value
+
+def set_dimension(key, value):
+    metrics = _current()
+    if metrics is not None:
+        metrics.properties[key] = value
+        if key not in metrics.dimensions:
+            metrics.dimensions.append(key)
+
+def flush():
+    metrics = _current()
+    _local.metrics = None
+    if metrics is None:
+        return
+    metrics.values["invocation"] = round((time.perf_counter() - metrics.started) * 1000, 3)
+    metrics.units["invocation"] = "Milliseconds"
+
+    log_line = dict(metrics.properties)
+    log_line.update(metrics.values)
+    log_line["_aws"] = {
+        "Timestamp": int(time.time() * 1000),
+        "CloudWatchMetrics": [{
+            "Namespace": METRICS_NAMESPACE,
+            "Dimensions": [metrics.dimensions],
+            "Metrics": [{"Name": name, "Unit": metrics.units[name]} for name in metrics.values],
+        }],
+    }
+    (_write or sys.stdout.write)(json.dumps(log_line) + "\n")
+
+def set_writer(write):
+    global _write
+    _write = write
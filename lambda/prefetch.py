@@ -0,0 +1,57 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Prefetch
+    The dialog is sequential, so once a step is committed we already know what data the next turn will need.
+    Prefetches run on a background thread pool; their results are written to the same caches the handlers read from,
+    and a handler that needs a value still being prefetched waits for that fetch instead of starting another one.
+
+    Note that Lambda freezes the container once the response is returned, so a prefetch that has not finished by
+    then resumes when the next invocation thaws the same container, possibly in the middle of its request. A handler
+    therefore only waits PREFETCH_WAIT seconds for a prefetch, and fetches the data itself after that.
+
+    - submit(key, loader): runs loader() in the background unless a prefetch for the key is already in flight, and
+      returns its future
+    - in_flight(key): returns the future of the in-flight prefetch for the key, or None
+    - wait_for(key, timeout): waits for the in-flight prefetch for the key; returns True if one finished successfully
+'''
+
+PREFETCH_WORKERS = 4
+# how long a handler waits for an in-flight prefetch before fetching the data itself
+PREFETCH_WAIT = float(os.environ.get("PREFETCH_WAIT", 0.2))
+
+executor = ThreadPoolExecutor(max_workers = PREFETCH_WORKERS, thread_name_prefix = "prefetch")
+
+_in_flight = {}
+_lock = threading.Lock()
+
+def _run(key, loader):
+    try:
+        return loader()
+    finally:
+        with _lock:
+            _in_flight.pop(key, None)
+
+def submit(key, loader):
+    with _lock:
+        future = _in_flight.get(key)
+        if future is None:
+            future = executor.submit(_run, key, loader)
+            _in_flight[key] = future
+        return future
+
+def in_flight(key):
+    with _lock:
+        return _in_flight.get(key)
+
+def wait_for(key, timeout = None):
+    future = in_flight(key)
+    if future is None:
+        return False
+    try:
+        future.result(timeout = timeout)
+    except Exception:
+        return False
+    return True
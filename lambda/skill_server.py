@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ask_sdk_model import RequestEnvelope
+
+import http_client
+from async_http import AsyncTransport, aiohttp
+
+if aiohttp is not None:
+    from aiohttp import web
+
+'''
+Skill server
+    Optional long-running entry point hosting the handlers of voice_assistant.py as an Alexa HTTPS endpoint, instead
+    of one Lambda invocation per request. One server process serves many sessions at once: the (synchronous) skill
+    handlers run on a thread pool, while every backend call goes through one aiohttp session on the event loop, where
+    identical requests in flight at the same time share a single call (see async_http.py). Several servers can run
+    behind a load balancer, as long as they share the answer job table (ANSWER_JOB_TABLE) so that any of them can
+    answer "check answer".
+
+    Requests are verified as coming from Alexa (signature and timestamp) with ask-sdk-webservice-support, which is
+    required unless the server runs with --no-verify (local testing only). aiohttp is required.
+
+    - RequestRejected: raised by the dispatcher for requests that fail verification (answered with HTTP 400)
+    - build_dispatcher(skill, verify): returns dispatch(headers, body), which (verifies and) invokes the skill and
+      returns the serialized response
+    - create_app(verify, workers): returns the aiohttp application serving the skill on POST /
+    - main(argv): runs the server
+
+    Usage (from the lambda directory):
+        python skill_server.py --port 8080
+        python skill_server.py --port 8080 --no-verify
+'''
+
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 32))
+BACKEND_CONNECTIONS = int(os.environ.get("BACKEND_CONNECTIONS", 100))
+
+logger = logging.getLogger(__name__)
+
+class RequestRejected(Exception):
+    pass
+
+def build_dispatcher(skill, verify):
+    if verify:
+        from ask_sdk_webservice_support.verifier import VerificationException
+        from ask_sdk_webservice_support.webservice_handler import WebserviceSkillHandler
+        handler = WebserviceSkillHandler(skill = skill)
+
+        def verify_and_dispatch(headers, body):
+            try:
+                return handler.verify_request_and_dispatch(headers, body)
+            except VerificationException as error:
+                raise RequestRejected(str(error)) from error
+        return verify_and_dispatch
+
+    def dispatch(headers, body):
+        request_envelope = skill.serializer.deserialize(payload = body, obj_type = RequestEnvelope)
+        response_envelope = skill.invoke(request_envelope = request_envelope, context = None)
+        return skill.serializer.serialize(response_envelope)
+    return dispatch
+
+def create_app(verify = True, workers = SERVER_WORKERS):
+    if aiohttp is None:
+        raise RuntimeError("The skill server requires aiohttp (pip install aiohttp)")
+    import voice_assistant
+
+    dispatch = build_dispatcher(voice_assistant.sb.create(), verify)
+    executor = ThreadPoolExecutor(max_workers = workers, thread_name_prefix = "skill")
+
+    async def handle_skill_request(request):
+        body = await request.text()
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(executor, dispatch, dict(request.headers), body)
+        except RequestRejected as error:
+            logger.warning("Rejected a request that could not be verified: %s", error)
+            return web.json_response({"message": "Request could not be verified"}, status = 400)
+        except Exception:
+            logger.exception("Could not handle the skill request")
+            return web.json_response({"message": "Internal error"}, status = 500)
+        return web.json_response(response)
+
+    async def start_backend_session(app):
+        app["backend_session"] = aiohttp.ClientSession(connector = aiohttp.TCPConnector(limit = BACKEND_CONNECTIONS))
+        http_client.set_transport(AsyncTransport(asyncio.get_running_loop(), app["backend_session"]))
+
+    async def close_backend_session(app):
+        http_client.set_transport(None)
+        await app["backend_session"].close()
+        executor.shutdown(wait = False)
+
+    app = web.Application()
+    app.router.add_post("/", handle_skill_request)
+    app.on_startup.append(start_backend_session)
+    app.on_cleanup.append(close_backend_session)
+    return app
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Serve the skill as an Alexa HTTPS endpoint.")
+    parser.add_argument("--host", default = "0.0.0.0")
+    parser.add_argument("--port", type = int, default = 8080)
+    parser.add_argument("--workers", type = int, default = SERVER_WORKERS, help = "threads running the skill handlers")
+    parser.add_argument("--no-verify", action = "store_true", help = "do not verify that requests come from Alexa")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level = logging.INFO)
+    web.run_app(create_app(verify = not args.no_verify, workers = args.workers), host = args.host, port = args.port)
+
+if __name__ == "__main__":
+    main()
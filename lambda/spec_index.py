@@ -0,0 +1,108 @@
+import re
+from bisect import bisect_left
+from difflib import SequenceMatcher
+
+'''
+Specialization index
+    Matching the spoken input against every specialization name on each request is linear in the number of
+    specializations, so the names of a program are normalized and indexed once: every token maps to the
+    specializations containing it, and the sorted vocabulary allows prefix lookups with a binary search.
+
+    - normalize(text): lower-cases the text, drops anything but letters and spaces and collapses whitespace
+    - SpecializationIndex(specs): inverted index over the given specialization names
+        - search(query, limit): returns the specializations matching every token of the query, best match first;
+          a query token matches an index token exactly, as a prefix, or as a near miss (e.g. "honors" / "honours")
+'''
+
+NON_LETTERS = re.compile("[^a-z ]")
+STOP_WORDS = frozenset(["a", "an", "and", "in", "of", "the"])
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.6
+FUZZY_CUTOFF = 0.8
+MIN_PREFIX_LENGTH = 2
+MAX_FUZZY_MATCHES_CACHED = 1024
+
+def normalize(text):
+    return " ".join(NON_LETTERS.sub("", text.lower()).split())
+
+class SpecializationIndex:
+
+    def __init__(self, specs):
+        self.specs = list(specs)
+        self.names = [normalize(spec) for spec in self.specs]
+        self.postings = {}
+        for spec_id, name in enumerate(self.names):
+            for token in set(name.split()):
+                self.postings.setdefault(token, set()).add(spec_id)
+        self.vocabulary = sorted(self.postings)
+        self._fuzzy_matches = {}
+
+    def __len__(self):
+        return len(self.specs)
+
+    def search(self, query, limit = None):
+        query = normalize(query)
+        tokens = [token for token in query.split() if token not in STOP_WORDS] or query.split()
+        if not tokens:
+            return []
+
+        scores = None
+        for token in tokens:
+            token_scores = self._match_token(token)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {spec_id: score + token_scores[spec_id] for spec_id, score in scores.items() if spec_id in token_scores}
+            if not scores:
+                return []
+
+        def rank(spec_id):
+            name = self.names[spec_id]
+            # whole-phrase matches first, then by token score, then shorter (more specific) names
+            return (name != query, query not in name, -scores[spec_id], len(name), spec_id)
+
+        ranked = sorted(scores, key = rank)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.specs[spec_id] for spec_id in ranked]
+
+    def _match_token(self, token):
+        token_scores = {}
+
+        def add(tokens, score):
+            for index_token in tokens:
+                for spec_id in self.postings[index_token]:
+                    if token_scores.get(spec_id, 0) < score:
+                        token_scores[spec_id] = score
+
+        if token in self.postings:
+            add([token], EXACT_SCORE)
+
+        if len(token) >= MIN_PREFIX_LENGTH:
+            start = bisect_left(self.vocabulary, token)
+            end = start
+            while end < len(self.vocabulary) and self.vocabulary[end].startswith(token):
+                end += 1
+            add(self.vocabulary[start:end], PREFIX_SCORE)
+
+        if not token_scores:
+            add(self._fuzzy(token), FUZZY_SCORE)
+
+        return token_scores
+
+    def _fuzzy(self, token):
+        if token not in self._fuzzy_matches:
+            if len(self._fuzzy_matches) >= MAX_FUZZY_MATCHES_CACHED:
+                self._fuzzy_matches.clear()
+            matches = []
+            matcher = SequenceMatcher(b = token)
+            for index_token in self.vocabulary:
+                if abs(len(index_token) - len(token)) > 2:
+                    continue
+                matcher.set_seq1(index_token)
+                if matcher.real_quick_ratio() >= FUZZY_CUTOFF and matcher.quick_ratio() >= FUZZY_CUTOFF and matcher.ratio() >= FUZZY_CUTOFF:
+                    matches.append(index_token)
+            self._fuzzy_matches[token] = matches
+        return self._fuzzy_matches[token]
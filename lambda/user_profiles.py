@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import deadline
+import metrics
+from cache import TTLCache
+from config import get_boto_config
+from constants import Status
+
+'''
+User profiles
+    A returning student usually has the same faculty, program, specialization and year level as last time, so these
+    are saved per Alexa user id and offered back at launch instead of being asked for again.
+
+    Profiles are written behind: save_profile updates the in-process tier right away and hands the write to a
+    background thread. Several saves for the same user before the write runs are merged into one write of the latest
+    profile. A background thread only runs while the container is thawed, so the turn that saves a profile flushes the
+    write (bounded by the invocation deadline), and so does the last turn of the session; a write still pending after
+    that is only finished if Lambda thaws the same container again. A write that fails drops the profile from the
+    in-process tier, so the next save writes it again instead of being skipped as unchanged.
+
+    Profile stores (get(user_id) / put(user_id, profile)):
+    - InMemoryProfileStore: process-local store, used offline and when no table is configured
+    - DynamoDBProfileStore: table of the skill function (USER_PROFILE_TABLE); profiles expire after PROFILE_TTL days
+
+    - PROFILE_FIELDS: the session attributes saved in a profile
+    - get_profile(user_id): returns the saved profile ({field: value}), or None when there is none or the store fails
+    - save_profile(user_id, attributes): saves the profile fields of the session attributes, if they changed
+    - flush_profiles(timeout): waits (at most timeout seconds) for the pending profile writes; call it before the
+      invocation returns
+    - configure_profiles(store): overrides the store picked from the environment (e.g. for offline runs)
+'''
+
+PROFILE_FIELDS = ["faculty", "program", "specialization", "year_level"]
+PROFILE_TTL = int(os.environ.get("PROFILE_TTL", 365)) * 86400
+PROFILE_CACHE_TTL = int(os.environ.get("PROFILE_CACHE_TTL", 3600))
+PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", 1024))
+
+logger = logging.getLogger(__name__)
+
+class InMemoryProfileStore:
+
+    def __init__(self):
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            return dict(profile) if profile is not None else None
+
+    def put(self, user_id, profile):
+        with self._lock:
+            self._profiles[user_id] = dict(profile)
+
+class DynamoDBProfileStore:
+
+    def __init__(self, table_name, ttl_seconds = PROFILE_TTL):
+        import boto3
+        self.table = boto3.resource("dynamodb", config = get_boto_config()).Table(table_name)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, user_id):
+        item = self.table.get_item(Key = {"user_id": user_id}).get("Item")
+        if item is None or item["expires_at"] <= time.time():
+            return None
+        return {field: item.get(field, Status.EMPTY.value) for field in PROFILE_FIELDS}
+
+    def put(self, user_id, profile):
+        item = {"user_id": user_id, "expires_at": int(time.time()) + self.ttl_seconds}
+        item.update(profile)
+        self.table.put_item(Item = item)
+
+local_profiles = TTLCache(maxsize = PROFILE_CACHE_SIZE, ttl = PROFILE_CACHE_TTL)
+
+# a single writer, so the writes of one user are never reordered
+writer = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "profile-writer")
+
+_store = None
+_pending = {}
+_writes = set()
+_lock = threading.Lock()
+
+def get_profile_store():
+    global _store
+    if _store is None:
+        table_name = os.environ.get("USER_PROFILE_TABLE")
+        _store = DynamoDBProfileStore(table_name) if table_name else InMemoryProfileStore()
+    return _store
+
+def configure_profiles(store = None):
+    global _store
+    _store = store
+    local_profiles.invalidate()
+
+def _profile_of(attributes):
+    return {field: attributes.get(field) or Status.EMPTY.value for field in PROFILE_FIELDS}
+
+def get_profile(user_id):
+    profile = local_profiles.get(user_id)
+    if profile is None:
+        try:
+            with metrics.span("user_profile.get"):
+                profile = deadline.call("user_profile.get", get_profile_store().get, user_id)
+        except Exception:
+            logger.warning("User profile lookup failed", exc_info = True)
+            return None
+        if profile is None:
+            metrics.record("user_profile_miss", 1, "Count")
+            return None
+        local_profiles.put(user_id, profile)
+    metrics.record("user_profile_hit", 1, "Count")
+    return dict(profile)
+
+def _write_profile(user_id):
+    with _lock:
+        profile = _pending.pop(user_id, None)
+    if profile is None:
+        return
+    try:
+        get_profile_store().put(user_id, profile)
+    except Exception:
+        # runs outside the handler, so the failure is only logged
+        logger.warning("User profile write failed", exc_info = True)
+        with _lock:
+            # unless a newer profile was saved meanwhile, forget the unwritten one, so the next save retries it
+            if local_profiles.get(user_id) == profile:
+                local_profiles.invalidate(user_id)
+
+def _forget(future):
+    with _lock:
+        _writes.discard(future)
+
+def save_profile(user_id, attributes):
+    profile = _profile_of(attributes)
+    with _lock:
+        if local_profiles.get(user_id) == profile:
+            return False
+        local_profiles.put(user_id, profile)
+        queued = user_id in _pending
+        _pending[user_id] = profile
+        if not queued:
+            future = writer.submit(_write_profile, user_id)
+            _writes.add(future)
+            future.add_done_callback(_forget)
+    metrics.record("user_profile_save", 1, "Count")
+    return True
+
+def flush_profiles(timeout = None):
+    with _lock:
+        writes = list(_writes)
+    if writes:
+        wait(writes, timeout = timeout)
@@ -1,55 +1,91 @@
-from ask_sdk_core.dispatch_components import AbstractRequestHandler
+from ask_sdk_core.dispatch_components import AbstractRequestHandler, AbstractRequestInterceptor, AbstractResponseInterceptor
 from ask_sdk_core.api_client import DefaultApiClient
-from ask_sdk_core.utils import is_request_type, is_intent_name
+from ask_sdk_core.utils import is_request_type, is_intent_name, get_user_id
 from ask_sdk_core.skill_builder import CustomSkillBuilder
 from ask_sdk_model.services.directive import (
     SendDirectiveRequest, Header, SpeakDirective)
-from ask_sdk_model.dialog import DynamicEntitiesDirective
-from ask_sdk_model.er.dynamic import UpdateBehavior, EntityListItem, Entity, EntityValueAndSynonyms
 from ask_sdk_model.slu.entityresolution.status_code import StatusCode
 
-from constants import *
-
+from botocore.exceptions import BotoCoreError, ClientError
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import re
+
+from constants import *
+import deadline
+import metrics
+from answer_jobs import submit_answer_job, get_answer_job, wait_for_answer_job
+from answer_cache import get_cached_answer, cache_answer
+from dialog import (
+    DIALOG_HANDLERS, initial_attributes, get_dialog_state, set_dialog_state, advance, encode_session, decode_session)
+from catalog import get_faculties, get_programs, get_specialization_index, prefetch_catalog, prefetch_snapshot, prefetch_specialization_index
+from directives import replace_dynamic_entities, clear_dynamic_entities, get_catalog_directive, entity_kind, faculty_synonyms
+from entity_budget import record_use
+from spec_index import normalize
+from user_profiles import get_profile, save_profile, flush_profiles
+
+import logging
+import time
 
 # SkillBuilder initialization
 sb = CustomSkillBuilder(api_client=DefaultApiClient())
 
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Runs outbound calls that overlap with the backend request (e.g. progressive responses)
+io_executor = ThreadPoolExecutor(max_workers = 4, thread_name_prefix = "skill-io")
+PROGRESSIVE_RESPONSE_TIMEOUT = 1
+# how long the turn that saves a user profile, and the last turn of a session, wait for the pending profile writes
+PROFILE_FLUSH_TIMEOUT = 1
+# failures of the backend and of the AWS services (answer jobs, answer cache) that end a turn with a fallback prompt
+DEPENDENCY_ERRORS = (requests.RequestException, BotoCoreError, ClientError)
+# Alexa accepts at most 5 progressive responses per request
+MAX_PROGRESSIVE_RESPONSES = 5
+# entity resolution authorities of dynamic entities are named "amzn1.er-authority.echo-sdk.dynamic.<skill id>.<slot type>"
+DYNAMIC_AUTHORITY = ".echo-sdk.dynamic."
+
 '''
 Helper functions
-    - get_canonical_value(handler_input, slot_name): given synonyms, returns the canonical value (original value assigned to the slot)
-    - replace_dynamic_entities(handler_input, entities, slot_name): replaces the dynamic entities in the Alexa skill with the given entities
-    - clear_dynamic_entities(handler_input, slot_name): clears the dynamic entities in the Alexa skill for the given slot
+    - get_canonical_value(handler_input, slot_name, kind): given synonyms, returns the canonical value (original value assigned to the slot)
+      of the given entity kind, from the dynamic entities first and then from the static values of the slot type
+    - find_by_name(handler_input, values, synonyms): returns the value the user said word for word (ignoring case and punctuation),
+      or one of its synonyms; catches values left out of a dynamic entity list by the entity budget, or of the interaction model
     - set_attribute(handler_input, key, val): sets the given attribute (key) to the given value (val)
     - get_attribute(handler_input, key): gets the given attribute (key)
     - is_first_question(handler_input): returns true if the current question is the first question
     - is_first_specific_question(handler_input): returns true if the current question is the first program-specific question
-    - add_faculty_entities(handler_input): adds the faculty entities to the Alexa skill (called when user chooses the question type)
     - is_specific: returns true if the question type is specific
     - is_attribute_empty: returns true if the given attribute is empty
+    - get_question_params(handler_input): returns the question endpoint parameters built from the session attributes
+    - describe_profile(profile): returns the spoken description of a saved user profile
+    - advance_dialog(handler_input): moves the dialog to the next step that still needs input
+    - set_dialog_step(handler_input, state): moves the dialog to the given step
+    - prefetch_next_step(handler_input): starts fetching, in the background, the catalog data the next turn will need
+    - send_progressive_response(handler_input, speech): sends a progressive response and returns how long it took (ms)
+    - start_progressive_response(handler_input, speech): sends a progressive response on the I/O thread pool
+    - finish_progressive_response(future): waits (bounded by the deadline) for a progressive response; failures are only logged
+    - follow_answer_job(handler_input, job_id, sent): while the answer job runs (for at most ANSWER_STREAM_WINDOW
+      seconds, within the deadline), speaks its finished sentences as progressive responses; returns the last job record and how much of
+      the answer was spoken
 '''
-def get_canonical_value(handler_input, slot_name):
-        input = handler_input.request_envelope.request.intent.slots[slot_name].resolutions.resolutions_per_authority[1]
-        return Status.NO_MATCH if input.status.code == StatusCode.ER_SUCCESS_NO_MATCH else input.values[0].value.name
-
-def replace_dynamic_entities(handler_input, entities, slot_name):
-
-    replace_entity_directive = DynamicEntitiesDirective(
-            update_behavior = UpdateBehavior.REPLACE,
-            types = [EntityListItem(name = slot_name, values = entities)]
-        )
-    
-    handler_input.response_builder.add_directive(replace_entity_directive)
-
-def clear_dynamic_entities(handler_input, slot_name):
-
-    clear_entity_directive = DynamicEntitiesDirective(
-            update_behavior = UpdateBehavior.CLEAR,
-            types = [EntityListItem(name = slot_name)]
-        )
-    
-    handler_input.response_builder.add_directive(clear_entity_directive)
+def get_canonical_value(handler_input, slot_name, kind):
+        resolutions = handler_input.request_envelope.request.intent.slots[slot_name].resolutions
+        authorities = (resolutions.resolutions_per_authority if resolutions is not None else None) or []
+        for input in sorted(authorities, key = lambda input: DYNAMIC_AUTHORITY not in input.authority):
+            if input.status.code != StatusCode.ER_SUCCESS_MATCH:
+                continue
+            for value in input.values:
+                if entity_kind(value.value.id) == kind:
+                    return value.value.name
+        return Status.NO_MATCH
+
+def find_by_name(handler_input, values, synonyms = None):
+        spoken = normalize(handler_input.request_envelope.request.intent.slots["text"].value or "")
+        for value in values:
+            names = [value] + (synonyms(value) if synonyms else [])
+            if spoken and any(normalize(name) == spoken for name in names):
+                return value
+        return Status.NO_MATCH
 
 def set_attribute(handler_input, key, val):
     handler_input.attributes_manager.session_attributes[key] = val
@@ -63,23 +99,90 @@ def is_first_question(handler_input):
 def is_first_specific_question(handler_input):
     return get_attribute(handler_input, "question_type") == QuestionType.SPECIFIC and get_attribute(handler_input, "specialization") == Status.EMPTY and get_attribute(handler_input, "year_level") == Status.EMPTY
 
-def add_faculty_entities(handler_input):
-    faculties = requests.get(BASE_URL + "faculties").json()
-    new_entities = []
-    for faculty in faculties:
-        entity_value = EntityValueAndSynonyms(value = faculty, synonyms = [faculty.lower(), faculty.lower().replace('the ', '')])
-        entity = Entity(name = entity_value)
-        new_entities.append(entity)
-    replace_dynamic_entities(handler_input, new_entities, "CATCHALL")
-
-    return QUESTION_TYPE_MESSAGES[MessageType.FIRST_QUESTION]
-
 def is_specific(handler_input):
     return get_attribute(handler_input, "question_type") == QuestionType.SPECIFIC
 
 def is_attribute_empty(handler_input, attribute):
     return get_attribute(handler_input, attribute) == Status.EMPTY
 
+def get_question_params(handler_input):
+    attributes = handler_input.attributes_manager.session_attributes
+    return {
+        "faculty" : attributes["faculty"],
+        "program" : attributes["program"],
+        "specialization" : attributes["specialization"] if is_specific(handler_input) else "",
+        "year" : attributes["year_level"] if is_specific(handler_input) else "",
+        "topic" : attributes["topic"],
+        "question" : attributes["question"],
+    }
+
+def describe_profile(profile):
+    parts = [f"{profile['program']} in the {profile['faculty']}"]
+    if profile["specialization"] != Status.EMPTY:
+        parts.append(profile["specialization"])
+    if profile["year_level"] != Status.EMPTY:
+        parts.append(f"in your {profile['year_level']}")
+    return ", ".join(parts)
+
+def advance_dialog(handler_input):
+    return advance(handler_input.attributes_manager.session_attributes)
+
+def set_dialog_step(handler_input, state):
+    set_dialog_state(handler_input.attributes_manager.session_attributes, state)
+
+def prefetch_next_step(handler_input):
+    state = get_dialog_state(handler_input.attributes_manager.session_attributes)
+    if state == DialogState.QUESTION_TYPE or state == DialogState.FACULTY:
+        # the faculties are static values of the interaction model; the faculty step only needs the programs
+        prefetch_snapshot()
+    elif state == DialogState.PROGRAM:
+        prefetch_catalog("programs", {"faculty" : get_attribute(handler_input, "faculty")})
+    elif state == DialogState.LOAD_SPECIALIZATION:
+        prefetch_specialization_index(get_attribute(handler_input, "faculty"), get_attribute(handler_input, "program"))
+
+def send_progressive_response(handler_input, speech):
+    started = time.perf_counter()
+    request_id_holder = handler_input.request_envelope.request.request_id
+    directive_header = Header(request_id = request_id_holder)
+    directive = SendDirectiveRequest(header = directive_header, directive = SpeakDirective(speech = speech))
+    directive_service_client = handler_input.service_client_factory.get_directive_service()
+    directive_service_client.enqueue(directive)
+    return (time.perf_counter() - started) * 1000
+
+def start_progressive_response(handler_input, speech):
+    return io_executor.submit(send_progressive_response, handler_input, speech)
+
+def finish_progressive_response(future):
+    try:
+        return future.result(timeout = deadline.clip(PROGRESSIVE_RESPONSE_TIMEOUT))
+    except Exception:
+        logger.warning("Progressive response failed", exc_info = True)
+        return None
+
+def follow_answer_job(handler_input, job_id, sent = 1):
+    window_end = time.monotonic() + deadline.clip(ANSWER_STREAM_WINDOW)
+    spoken = 0
+    job = get_answer_job(job_id)
+    while job is not None and job["status"] == JobStatus.PENDING:
+        if len(job["answer"]) > spoken and sent < MAX_PROGRESSIVE_RESPONSES:
+            # the directive service client has no timeout of its own
+            elapsed = finish_progressive_response(start_progressive_response(handler_input, job["answer"][spoken:]))
+            if elapsed is None:
+                break
+            metrics.record("directive_service.progressive_response", elapsed)
+            spoken = len(job["answer"])
+            sent += 1
+        remaining = window_end - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            job = wait_for_answer_job(job_id, job, min(ANSWER_POLL_INTERVAL, remaining))
+        except deadline.DeadlineExceeded:
+            # keep what was spoken so far; the rest is read out at "check answer"
+            logger.warning("Answer job poll ran out of time", exc_info = True)
+            break
+    return job, spoken
+
 # Request Handlers
 class LaunchRequestHandler(AbstractRequestHandler):
 
@@ -88,59 +191,70 @@ class LaunchRequestHandler(AbstractRequestHandler):
     
     def handle(self, handler_input):
 
-        self.initialize_session_attributes(handler_input)
+        profile = get_profile(get_user_id(handler_input))
+        if profile and (profile["faculty"] == Status.EMPTY or profile["program"] == Status.EMPTY):
+            profile = None
+
+        self.initialize_session_attributes(handler_input, profile)
+
+        if profile:
+            # returning student: confirm the saved faculty, program, specialization and year level in one turn
+            speech_text = f"{PROFILE_MESSAGES[MessageType.GREETINGS]} Last time, you told me you are in {describe_profile(profile)}. " + PROFILE_MESSAGES[MessageType.SPEECH]
+            return handler_input.response_builder.speak(speech_text).ask(PROFILE_MESSAGES[MessageType.REPROMPT]).set_should_end_session(False).response
 
-        replace_dynamic_entities(handler_input, QUESTION_TYPE_ENTITIES, "CATCHALL")
-        
         return (
             handler_input.response_builder
             .speak(LAUNCH_MESSAGES[MessageType.SPEECH])
             .ask(LAUNCH_MESSAGES[MessageType.REPROMPT]).set_should_end_session(False).response
         )
     
-    def initialize_session_attributes(self, handler_input):
-        for attribute in ATTRIBUTES:
-            set_attribute(handler_input, attribute, Status.EMPTY)
+    def initialize_session_attributes(self, handler_input, profile = None):
+        handler_input.attributes_manager.session_attributes = initial_attributes(profile)
 
 class CatchAllIntentHandler(AbstractRequestHandler):
     def can_handle(self, handler_input):
         return is_intent_name("CatchAllIntent")(handler_input)
     
     def handle(self, handler_input):
-        if is_attribute_empty(handler_input, "question_type"):
-            return self.handle_question_type(handler_input)
-        elif is_attribute_empty(handler_input, "faculty"):
-            return self.handle_faculty(handler_input)
-        elif is_attribute_empty(handler_input, "program"):
-            return self.handle_program(handler_input)
-        elif is_specific(handler_input) and is_attribute_empty(handler_input, "specialization"):
-            return self.load_specialization(handler_input) 
-        elif get_attribute(handler_input, "specialization") == Status.LOADED:
-            return self.handle_specialization(handler_input)
-        elif is_specific(handler_input) and is_attribute_empty(handler_input, "year_level"):
-            return self.handle_year_level(handler_input)
-        elif is_attribute_empty(handler_input, "topic"):
-            return self.handle_topic(handler_input)
-        elif get_attribute(handler_input, "ask_another_question") == Status.WAITING:
-            return self.handle_ask_another_question(handler_input)
-        elif not is_attribute_empty(handler_input, "question"):
-            return self.handle_check_answer(handler_input)
-        else:
-            return self.handle_question(handler_input)
+        state = get_dialog_state(handler_input.attributes_manager.session_attributes)
+        branch = getattr(self, DIALOG_HANDLERS[state])
+
+        metrics.set_dimension("Handler", branch.__name__)
+        metrics.set_property("dialog_state", state.value)
+        saved_attributes = dict(handler_input.attributes_manager.session_attributes)
+        try:
+            with metrics.span(branch.__name__):
+                return branch(handler_input)
+        except DEPENDENCY_ERRORS:
+            # a dependency is down or the deadline is near: stay on this step and ask the user to repeat
+            logger.warning("Dependency call failed in %s", branch.__name__, exc_info = True)
+            metrics.record("backend_fallback", 1, "Count")
+            attributes = handler_input.attributes_manager.session_attributes
+            handler_input.attributes_manager.session_attributes = saved_attributes
+            handler_input.response_builder.response.directives = None
+            if attributes["job_id"] != Status.EMPTY:
+                # the question was already submitted: keep its job, so the student can ask for the answer
+                for attribute in ("question", "job_id", "spoken"):
+                    set_attribute(handler_input, attribute, attributes[attribute])
+                set_dialog_step(handler_input, DialogState.CHECK_ANSWER)
+                speech_text = QUESTION_MESSAGES[MessageType.WAITING] if attributes["spoken"] else QUESTION_MESSAGES[MessageType.SPEECH]
+            else:
+                speech_text = FALLBACK_MESSAGES[MessageType.ASK_AGAIN]
+            return handler_input.response_builder.speak(speech_text).ask(speech_text).response
     
     def handle_question_type(self, handler_input):
         rb = handler_input.response_builder
-        question_type = get_canonical_value(handler_input, "text")
+        question_type = get_canonical_value(handler_input, "text", "question_type")
 
         if question_type == Status.NO_MATCH:
             speech_text = QUESTION_TYPE_MESSAGES[MessageType.ASK_AGAIN]
             return rb.speak(speech_text).ask(speech_text).response
 
         set_attribute(handler_input, "question_type", question_type)
-        clear_dynamic_entities(handler_input, "CATCHALL")
+        advance_dialog(handler_input)
 
         if is_first_question(handler_input):
-            speech_text = add_faculty_entities(handler_input)
+            speech_text = QUESTION_TYPE_MESSAGES[MessageType.FIRST_QUESTION]
         elif is_first_specific_question(handler_input):
             speech_text = QUESTION_TYPE_MESSAGES[MessageType.FIRST_SPECIFIC_QUESTION]
         else:
@@ -150,25 +264,29 @@ class CatchAllIntentHandler(AbstractRequestHandler):
     
     def handle_faculty(self, handler_input):
         rb = handler_input.response_builder
-        faculty_name = get_canonical_value(handler_input, "text")
+        faculty_name = get_canonical_value(handler_input, "text", "faculty")
+        if faculty_name == Status.NO_MATCH:
+            # a faculty added to the catalog after the interaction model was generated is not a static value
+            faculty_name = find_by_name(handler_input, get_faculties(), faculty_synonyms)
 
         if faculty_name == Status.NO_MATCH:
+            # let Alexa resolve the next attempt against the catalog's faculties as well
+            replace_dynamic_entities(handler_input, get_catalog_directive("faculty", get_faculties()))
             speech_text = FACULTY_MESSAGES[MessageType.ASK_AGAIN]
             return rb.speak(speech_text).ask(speech_text).response
         
-        set_attribute(handler_input, "faculty", faculty_name)
-
-        request_param = {"faculty" : faculty_name}
-        available_programs = requests.get(BASE_URL + "programs", params = request_param).json()
+        available_programs = get_programs(faculty_name)
+        if not available_programs:
+            # the interaction model lists a faculty the backend's catalog does not have (any more)
+            logger.warning("No programs found for faculty %s", faculty_name)
+            metrics.record("faculty_without_programs", 1, "Count")
+            speech_text = FACULTY_MESSAGES[MessageType.ASK_AGAIN]
+            return rb.speak(speech_text).ask(speech_text).response
 
-        new_entities = []
-        for program in available_programs:
-            entity_value = EntityValueAndSynonyms(value = program)
-            entity = Entity(name = entity_value)
-            new_entities.append(entity)
+        set_attribute(handler_input, "faculty", faculty_name)
+        advance_dialog(handler_input)
 
-        clear_dynamic_entities(handler_input, "CATCHALL")
-        replace_dynamic_entities(handler_input, new_entities, "CATCHALL")
+        replace_dynamic_entities(handler_input, get_catalog_directive("program", available_programs))
 
         speech_text = f"Your faculty is {faculty_name}. " + FACULTY_MESSAGES[MessageType.SPEECH]
 
@@ -176,13 +294,17 @@ class CatchAllIntentHandler(AbstractRequestHandler):
 
     def handle_program(self, handler_input):
         rb = handler_input.response_builder
-        program_name = get_canonical_value(handler_input, "text")
+        program_name = get_canonical_value(handler_input, "text", "program")
+        if program_name == Status.NO_MATCH:
+            program_name = find_by_name(handler_input, get_programs(get_attribute(handler_input, "faculty")))
 
         if program_name == Status.NO_MATCH:
             speech_text = PROGRAM_MESSAGES[MessageType.ASK_AGAIN]
             return rb.speak(speech_text).ask(speech_text).response
         
         set_attribute(handler_input, "program", program_name)
+        record_use("program", program_name)
+        advance_dialog(handler_input)
 
         if get_attribute(handler_input, "question_type") == QuestionType.GENERAL:
             speech_text = f"Your program is {program_name}. " + PROGRAM_MESSAGES[MessageType.SPEECH]
@@ -200,51 +322,43 @@ class CatchAllIntentHandler(AbstractRequestHandler):
         faculty_name = get_attribute(handler_input, "faculty")
         program_name = get_attribute(handler_input, "program")
 
-        request_param = {
-            "faculty" : faculty_name,
-            "program" : program_name
-        }
-        available_specs = requests.get(BASE_URL + "specializations", params = request_param).json()
+        spec_index = get_specialization_index(faculty_name, program_name)
 
-        new_entities = []
-        
         spec_input = handler_input.request_envelope.request.intent.slots["text"]
-        for spec in available_specs:
-            regex = re.compile('[^a-zA-Z ]')
-            spec_name = regex.sub('', spec.lower()).replace("  ", " ")
-            if spec_input.value.lower() in spec_name:
-                entity_value = EntityValueAndSynonyms(value = spec, synonyms = [spec_name])
-                entity = Entity(name = entity_value)
-                new_entities.append(entity)
+        matching_specs = spec_index.search(spec_input.value)
         
-        if not new_entities:
+        if not matching_specs:
             speech_text = LOAD_SPEC_MESSAGES[MessageType.ASK_AGAIN]
             return rb.speak(speech_text).ask(speech_text).response
-        elif len(new_entities) == 1:
-            set_attribute(handler_input, "specialization", new_entities[0].name.value)
-            replace_dynamic_entities(handler_input, YEAR_LEVEL_ENTITIES, "CATCHALL")
-            speech_text = f"Your specialization is {new_entities[0].name.value}. " + LOAD_SPEC_MESSAGES[MessageType.SPEECH]
+        elif len(matching_specs) == 1:
+            set_attribute(handler_input, "specialization", matching_specs[0])
+            advance_dialog(handler_input)
+            speech_text = f"Your specialization is {matching_specs[0]}. " + LOAD_SPEC_MESSAGES[MessageType.SPEECH]
             return rb.speak(speech_text).ask(speech_text).response
         else:
-            set_attribute(handler_input, "specialization", "loaded")
+            set_dialog_step(handler_input, DialogState.SPECIALIZATION)
             speech_text = LOAD_SPEC_MESSAGES[MessageType.CONFIRM_SPEC]
         
-        replace_dynamic_entities(handler_input, new_entities, "CATCHALL")
+        # search results come best match first
+        replace_dynamic_entities(handler_input, get_catalog_directive("specialization", matching_specs, ranked = True))
 
         return rb.speak(speech_text).ask(speech_text).response
     
     def handle_specialization(self, handler_input):
         rb = handler_input.response_builder
-        specialization_name = get_canonical_value(handler_input, "text")
+        specialization_name = get_canonical_value(handler_input, "text", "specialization")
+        if specialization_name == Status.NO_MATCH:
+            spec_index = get_specialization_index(get_attribute(handler_input, "faculty"), get_attribute(handler_input, "program"))
+            specialization_name = find_by_name(handler_input, spec_index.specs)
 
         if specialization_name == Status.NO_MATCH:
             speech_text = SPEC_MESSAGES[MessageType.ASK_AGAIN]
             return rb.speak(speech_text).ask(speech_text).response
         
         set_attribute(handler_input, "specialization", specialization_name)
+        advance_dialog(handler_input)
 
         clear_dynamic_entities(handler_input, "CATCHALL")
-        replace_dynamic_entities(handler_input, YEAR_LEVEL_ENTITIES, "CATCHALL")
 
         speech_text = f"Your specialization is {specialization_name}. " + SPEC_MESSAGES[MessageType.SPEECH]
 
@@ -256,15 +370,14 @@ class CatchAllIntentHandler(AbstractRequestHandler):
     
     def handle_year_level(self, handler_input):
         rb = handler_input.response_builder
-        year_level = get_canonical_value(handler_input, "text")
+        year_level = get_canonical_value(handler_input, "text", "year_level")
 
         if year_level == Status.NO_MATCH:
             speech_text = YEAR_MESSAGES[MessageType.ASK_AGAIN]
             return rb.speak(speech_text).ask(speech_text).response
         
         set_attribute(handler_input, "year_level", year_level)
-
-        clear_dynamic_entities(handler_input, "CATCHALL")
+        advance_dialog(handler_input)
 
         speech_text = f"You are currently in your {year_level}. " + YEAR_MESSAGES[MessageType.SPEECH]
         return handler_input.response_builder.speak(speech_text).ask(speech_text).response
@@ -272,58 +385,74 @@ class CatchAllIntentHandler(AbstractRequestHandler):
     def handle_topic(self, handler_input):
         topic = handler_input.request_envelope.request.intent.slots["text"].value
         set_attribute(handler_input, "topic", topic)
+        advance_dialog(handler_input)
 
         speech_text = f"Your topic is {topic}. " + TOPIC_MESSAGES[MessageType.SPEECH]
 
         return handler_input.response_builder.speak(speech_text).ask(speech_text).response
     
-    def handle_check_answer(self, handler_input):
-
-        answer = get_attribute(handler_input, "answer")
+    def handle_check_answer(self, handler_input, answer = Status.EMPTY):
+        rb = handler_input.response_builder
 
-        speech_text = answer if answer != Status.EMPTY else CHECK_ANS_MESSAGES[MessageType.ASK_AGAIN]
+        job_id = get_attribute(handler_input, "job_id")
+        # part of the answer already spoken while it was being generated
+        spoken = get_attribute(handler_input, "spoken") or 0
+
+        if answer == Status.EMPTY and job_id != Status.EMPTY:
+            job = get_answer_job(job_id)
+            if job is not None and job["status"] == JobStatus.PENDING:
+                speech_text = job["answer"][spoken:] + CHECK_ANS_MESSAGES[MessageType.WAITING]
+                set_attribute(handler_input, "spoken", max(spoken, len(job["answer"])) or Status.EMPTY)
+                return rb.speak(speech_text).ask(CHECK_ANS_MESSAGES[MessageType.WAITING]).response
+            if job is not None and job["answer"]:
+                answer = job["answer"]
+                cache_answer(get_question_params(handler_input), answer, persist = False)
+            set_attribute(handler_input, "job_id", Status.EMPTY)
+
+        speech_text = answer[spoken:] if answer != Status.EMPTY else CHECK_ANS_MESSAGES[MessageType.ASK_AGAIN]
         speech_text += CHECK_ANS_MESSAGES[MessageType.SPEECH]
+        set_attribute(handler_input, "spoken", Status.EMPTY)
 
-        replace_dynamic_entities(handler_input, YES_NO_ENTITIES, "CATCHALL")
-        set_attribute(handler_input, "ask_another_question", Status.WAITING)
+        set_dialog_step(handler_input, DialogState.ASK_ANOTHER_QUESTION)
         
-        return handler_input.response_builder.speak(speech_text).ask(speech_text).response
+        return rb.speak(speech_text).ask(speech_text).response
 
     def handle_question(self, handler_input):
 
-        attributes = handler_input.attributes_manager.session_attributes
         question = handler_input.request_envelope.request.intent.slots["text"].value
 
         set_attribute(handler_input, "question", question)
 
-        request_param = {
-            "faculty" : attributes["faculty"],
-            "program" : attributes["program"],
-            "specialization" : attributes["specialization"] if is_specific(handler_input) else "",
-            "year" : attributes["year_level"] if is_specific(handler_input) else "",
-            "topic" : attributes["topic"],
-            "question" : question,
-        }
+        request_param = get_question_params(handler_input)
+
+        cached_answer = get_cached_answer(request_param)
+        if cached_answer is not None:
+            return self.handle_check_answer(handler_input, cached_answer)
 
-        request_id_holder = handler_input.request_envelope.request.request_id
-        directive_header = Header(request_id = request_id_holder)
-        speech = SpeakDirective(speech = QUESTION_MESSAGES[MessageType.PROGRESSIVE_RESPONSE])
-        directive = SendDirectiveRequest(header = directive_header, directive = speech)
-        directive_service_client = handler_input.service_client_factory.get_directive_service()
-        directive_service_client.enqueue(directive)
+        # the progressive response and the job submission are independent round trips, so they run in parallel
+        progressive_response = start_progressive_response(handler_input, QUESTION_MESSAGES[MessageType.PROGRESSIVE_RESPONSE])
 
-        response = requests.get(BASE_URL + "question", params = request_param, timeout = 180).json()
-        answer = response['main_response'] if response['main_response'] else Status.EMPTY
+        job_id = submit_answer_job(request_param)
 
-        set_attribute(handler_input, "answer", answer)
+        metrics.record("directive_service.progressive_response", finish_progressive_response(progressive_response))
 
-        speech_text = QUESTION_MESSAGES[MessageType.SPEECH]
+        set_attribute(handler_input, "job_id", job_id)
+        advance_dialog(handler_input)
+
+        # speak the answer's first sentences while the rest is generated; a short answer is read out right away
+        with metrics.span("answer_stream.follow"):
+            job, spoken = follow_answer_job(handler_input, job_id)
+        set_attribute(handler_input, "spoken", spoken or Status.EMPTY)
+        if job is None or job["status"] != JobStatus.PENDING:
+            return self.handle_check_answer(handler_input)
+
+        speech_text = QUESTION_MESSAGES[MessageType.WAITING] if spoken else QUESTION_MESSAGES[MessageType.SPEECH]
         
         return handler_input.response_builder.speak(speech_text).ask(speech_text).response
     
     def handle_ask_another_question(self, handler_input):
         rb = handler_input.response_builder
-        ask_another_question = get_canonical_value(handler_input, "text")
+        ask_another_question = get_canonical_value(handler_input, "text", "yes_no")
 
         if ask_another_question == Status.NO_MATCH:
             speech_text = ASK_ANOTHER_Q_MESSAGES[MessageType.ASK_AGAIN]
@@ -333,12 +462,31 @@ class CatchAllIntentHandler(AbstractRequestHandler):
             speech_text = ASK_ANOTHER_Q_MESSAGES[MessageType.GREETINGS]
             return rb.speak(speech_text).set_should_end_session(True).response
         
-        slots = ["question_type", "question", "topic", "answer", "ask_another_question"]
+        slots = ["question_type", "question", "topic", "job_id", "spoken"]
         for slot in slots:
             set_attribute(handler_input, slot, Status.EMPTY)
-        
-        clear_dynamic_entities(handler_input, "CATCHALL")
-        replace_dynamic_entities(handler_input, QUESTION_TYPE_ENTITIES, "CATCHALL")
+        advance_dialog(handler_input)
+
+        speech_text = ASK_ANOTHER_Q_MESSAGES[MessageType.SPEECH]
+
+        return rb.speak(speech_text).ask(speech_text).response
+
+    def handle_confirm_profile(self, handler_input):
+        rb = handler_input.response_builder
+        confirmed = get_canonical_value(handler_input, "text", "yes_no")
+
+        if confirmed == Status.NO_MATCH:
+            speech_text = PROFILE_MESSAGES[MessageType.ASK_AGAIN]
+            return rb.speak(speech_text).ask(speech_text).response
+
+        if confirmed == YesNo.NO:
+            metrics.record("user_profile_rejected", 1, "Count")
+            handler_input.attributes_manager.session_attributes = initial_attributes()
+            speech_text = PROFILE_MESSAGES[MessageType.FIRST_QUESTION]
+            return rb.speak(speech_text).ask(LAUNCH_MESSAGES[MessageType.REPROMPT]).response
+
+        metrics.record("user_profile_confirmed", 1, "Count")
+        advance_dialog(handler_input)
 
         speech_text = ASK_ANOTHER_Q_MESSAGES[MessageType.SPEECH]
 
@@ -352,8 +500,65 @@ class SessionEndedRequestHandler(AbstractRequestHandler):
     def handle(self, handler_input):
         return handler_input.response_builder.set_should_end_session(True).response
 
+# Request Interceptors
+class DeadlineRequestInterceptor(AbstractRequestInterceptor):
+
+    def process(self, handler_input):
+        deadline.start(handler_input.context)
+
+class MetricsRequestInterceptor(AbstractRequestInterceptor):
+
+    def process(self, handler_input):
+        metrics.start_invocation()
+        metrics.set_dimension("Handler", handler_input.request_envelope.request.object_type)
+
+class SessionRequestInterceptor(AbstractRequestInterceptor):
+
+    def process(self, handler_input):
+        if handler_input.request_envelope.session is not None:
+            handler_input.attributes_manager.session_attributes = decode_session(handler_input.attributes_manager.session_attributes)
+
+# Response Interceptors
+class PrefetchResponseInterceptor(AbstractResponseInterceptor):
+
+    def process(self, handler_input, response):
+        if response is not None and not response.should_end_session:
+            prefetch_next_step(handler_input)
+
+class ProfileResponseInterceptor(AbstractResponseInterceptor):
+
+    def process(self, handler_input, response):
+        if handler_input.request_envelope.session is None:
+            return
+        attributes = handler_input.attributes_manager.session_attributes
+        # the profile is complete once the dialog asks for the topic
+        saved = False
+        if attributes and get_dialog_state(attributes) == DialogState.TOPIC:
+            saved = save_profile(get_user_id(handler_input), attributes)
+        # the writer thread is frozen with the container between invocations, so the write is not left pending
+        if saved or response is None or response.should_end_session:
+            flush_profiles(deadline.clip(PROFILE_FLUSH_TIMEOUT))
+
+class SessionResponseInterceptor(AbstractResponseInterceptor):
+
+    def process(self, handler_input, response):
+        if handler_input.request_envelope.session is not None:
+            handler_input.attributes_manager.session_attributes = encode_session(handler_input.attributes_manager.session_attributes)
+
+class MetricsResponseInterceptor(AbstractResponseInterceptor):
+
+    def process(self, handler_input, response):
+        metrics.flush()
+
 sb.add_request_handler(LaunchRequestHandler())
 sb.add_request_handler(CatchAllIntentHandler())
 sb.add_request_handler(SessionEndedRequestHandler())
+sb.add_global_request_interceptor(DeadlineRequestInterceptor())
+sb.add_global_request_interceptor(MetricsRequestInterceptor())
+sb.add_global_request_interceptor(SessionRequestInterceptor())
+sb.add_global_response_interceptor(PrefetchResponseInterceptor())
+sb.add_global_response_interceptor(ProfileResponseInterceptor())
+sb.add_global_response_interceptor(SessionResponseInterceptor())
+sb.add_global_response_interceptor(MetricsResponseInterceptor())
 
 lambda_handler = sb.lambda_handler()
\ No newline at end of file
@@ -1,6 +1,7 @@
-import { Duration, Stack, StackProps } from 'aws-cdk-lib';
+import { Duration, RemovalPolicy, Stack, StackProps } from 'aws-cdk-lib';
 import * as lambda from 'aws-cdk-lib/aws-lambda';
 import * as iam from 'aws-cdk-lib/aws-iam';
+import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
 import * as ask from 'cdk-skill-management';
 import * as secretsmanager from 'aws-cdk-lib/aws-secretsmanager';
 import { Asset } from 'aws-cdk-lib/aws-s3-assets';
@@ -43,7 +44,49 @@ export class VoiceAssistantStack extends Stack {
         });
 
         backendRole.addToPolicy(logPolicy);
-        
+
+        const answerJobTable = new dynamodb.Table(this, 'answer-job-table', {
+            partitionKey: { name: 'job_id', type: dynamodb.AttributeType.STRING },
+            billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+            timeToLiveAttribute: 'expires_at',
+            removalPolicy: RemovalPolicy.DESTROY
+        });
+
+        answerJobTable.grantReadWriteData(backendRole);
+
+        const answerCacheTable = new dynamodb.Table(this, 'answer-cache-table', {
+            partitionKey: { name: 'cache_key', type: dynamodb.AttributeType.STRING },
+            billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+            timeToLiveAttribute: 'expires_at',
+            removalPolicy: RemovalPolicy.DESTROY
+        });
+
+        answerCacheTable.grantReadWriteData(backendRole);
+
+        const userProfileTable = new dynamodb.Table(this, 'user-profile-table', {
+            partitionKey: { name: 'user_id', type: dynamodb.AttributeType.STRING },
+            billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+            timeToLiveAttribute: 'expires_at',
+            removalPolicy: RemovalPolicy.DESTROY
+        });
+
+        userProfileTable.grantReadWriteData(backendRole);
+
+        const answerWorker = new lambda.Function(this, 'answer-worker', {
+            runtime: lambda.Runtime.PYTHON_3_11,
+            code: lambda.Code.fromAsset('./lambda'),
+            role: backendRole,
+            handler: 'answer_jobs.worker_handler',
+            layers: [skillBackendLayer],
+            timeout: Duration.minutes(3),
+            // a failed job is recorded as FAILED; retrying it would flip it back to PENDING and load a failing backend
+            retryAttempts: 0,
+            environment: {
+                URL_PARAM: "/student-advising/BEANSTALK_URL",
+                ANSWER_JOB_TABLE: answerJobTable.tableName,
+                ANSWER_CACHE_TABLE: answerCacheTable.tableName
+            }
+        });
 
         const skillBackend = new lambda.Function(this, 'skill-backend', {
             runtime: lambda.Runtime.PYTHON_3_11,
@@ -53,10 +96,25 @@ export class VoiceAssistantStack extends Stack {
             layers: [skillBackendLayer],
             timeout: Duration.seconds(30),
             environment: {
-                URL_PARAM: "/student-advising/BEANSTALK_URL"
+                URL_PARAM: "/student-advising/BEANSTALK_URL",
+                ANSWER_JOB_TABLE: answerJobTable.tableName,
+                ANSWER_WORKER_FUNCTION: answerWorker.functionName,
+                ANSWER_CACHE_TABLE: answerCacheTable.tableName,
+                USER_PROFILE_TABLE: userProfileTable.tableName
             }
         });
 
+        // Kept out of the role's default policy so the functions do not depend on their own ARN
+        new iam.Policy(this, 'answer-worker-invoke-policy', {
+            roles: [backendRole],
+            statements: [
+                new iam.PolicyStatement({
+                    resources: [answerWorker.functionArn],
+                    actions: ["lambda:InvokeFunction"]
+                })
+            ]
+        });
+
         const skillPermission = new ask.SkillEndpointPermission(this, 'skill-permission', {
             handler: skillBackend,
             skillType: ask.SkillType.CUSTOM,
@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(ROOT_DIR, "lambda")
+sys.path.insert(0, LAMBDA_DIR)
+
+from directives import STATIC_ENTITIES, build_entity, entity_kind
+
+'''
+Interaction model generator
+    Writes the values known before deployment (question types, year levels, yes/no and the faculties of the catalog)
+    into the CATCHALL slot type of the interaction model, with their synonyms, so the skill does not have to send
+    them as dynamic entities at runtime. Every value gets an id prefixed with its kind (see directives.py).
+
+    The catalog is read from the backend's catalog endpoint (through catalog.py, with the same fallback to the
+    faculties endpoint), or from a local JSON file in the same format, {faculty: {program: [specialization]}}.
+    Values without a kind, the filler phrases that let the CATCHALL slot capture free-form speech, are kept as they
+    are; the generated values are replaced on every run. The committed model is generated from the sample catalog in
+    scripts/fixtures/catalog.json, test data, so it should be regenerated from the backend before deploying, and
+    again (with a redeploy) when the faculties change; faculties missing from the model are resolved at runtime
+    against the catalog. --check only compares, and exits with 1 when the model is out of date. Run against the
+    sample catalog (npm run check-sample-model), it only keeps the committed model and the sample catalog in sync.
+
+    - load_faculties(catalog_path): returns the faculties of the catalog file, or of the backend when no file is given
+    - static_values(faculties): returns the generated slot type values
+    - slot_value(entity): converts an entity to an interaction model slot type value
+    - update_interaction_model(model, values, slot_type): replaces the generated values of the slot type in the model
+
+    Usage (from the repository root):
+        python scripts/generate_interaction_model.py --catalog scripts/fixtures/catalog.json
+        BASE_URL=http://backend.example.com python scripts/generate_interaction_model.py
+        python scripts/generate_interaction_model.py --catalog catalog.json --check
+'''
+
+MODEL_PATH = os.path.join(ROOT_DIR, "skills", "skill-package", "interactionModels", "custom", "en-CA.json")
+
+def load_faculties(catalog_path = None):
+    if catalog_path:
+        with open(catalog_path) as catalog_file:
+            return list(json.load(catalog_file))
+    from catalog import get_faculties
+    return list(get_faculties())
+
+def slot_value(entity):
+    value = entity.name.value
+    name = {"value": value}
+    seen = {value.lower()}
+    synonyms = []
+    for synonym in entity.name.synonyms or []:
+        if synonym.lower() not in seen:
+            seen.add(synonym.lower())
+            synonyms.append(synonym)
+    if synonyms:
+        name["synonyms"] = synonyms
+    return {"id": entity.id, "name": name}
+
+def static_values(faculties):
+    entities = [entity for kind_entities in STATIC_ENTITIES.values() for entity in kind_entities]
+    entities.extend(build_entity("faculty", faculty) for faculty in faculties)
+    return [slot_value(entity) for entity in entities]
+
+def update_interaction_model(model, values, slot_type = "CATCHALL"):
+    types = model["interactionModel"]["languageModel"]["types"]
+    slot = next(slot for slot in types if slot["name"] == slot_type)
+    fillers = [value for value in slot["values"] if entity_kind(value.get("id")) is None]
+    slot["values"] = fillers + values
+    return model
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description = "Write the static slot values of the skill into its interaction model.")
+    parser.add_argument("--catalog", help = "catalog JSON file to read instead of the backend")
+    parser.add_argument("--model", default = MODEL_PATH, help = "interaction model to update")
+    parser.add_argument("--check", action = "store_true", help = "only check that the model is up to date")
+    return parser.parse_args(argv)
+
+def main(argv = None):
+    args = parse_args(argv)
+    with open(args.model) as model_file:
+        current = model_file.read()
+
+    values = static_values(load_faculties(args.catalog))
+    model = update_interaction_model(json.loads(current), values)
+    generated = json.dumps(model, indent = 2, ensure_ascii = False)
+
+    if args.check:
+        if generated != current:
+            print(f"{args.model} is out of date; run scripts/generate_interaction_model.py")
+            return 1
+        return 0
+
+    with open(args.model, "w") as model_file:
+        model_file.write(generated)
+    print(f"Wrote {len(values)} static values to {args.model}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
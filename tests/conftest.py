@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "lambda"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmark"))
+
+import answer_cache
+import config
+import deadline
+import http_client
+from circuit_breaker import CircuitBreaker
+from stub_backend import StubBackend, build_catalog
+
+class FakeClock:
+
+    def __init__(self, now = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture(autouse = True)
+def isolated_answer_cache():
+    # no persistent tier, and an empty in-process tier for every test
+    answer_cache.configure_answer_cache(None)
+    yield
+    answer_cache.configure_answer_cache(None)
+
+@pytest.fixture
+def backend_at(monkeypatch):
+    # points the HTTP client at a base URL, with a new session and circuit breaker
+    def point_at(url):
+        monkeypatch.setenv("BASE_URL", url)
+        config.get_base_url.cache_clear()
+        monkeypatch.setattr(http_client, "_session", None)
+        monkeypatch.setattr(http_client, "breaker", CircuitBreaker())
+        deadline.clear()
+    yield point_at
+    config.get_base_url.cache_clear()
+
+@pytest.fixture
+def stub_backend(backend_at):
+    backend = StubBackend(build_catalog(2, 2, 3), stream = True).start()
+    backend_at(backend.url)
+    yield backend
+    backend.stop()
@@ -0,0 +1,78 @@
+import pytest
+import requests
+
+from answer_cache import cache_answer
+from answer_jobs import InMemoryJobStore, run_answer_job, sentence_boundary
+from constants import JobStatus
+from stub_backend import answer_text
+
+PARAMS = {"faculty": "Faculty of Science", "program": "Bachelor of Science", "specialization": "", "year": "", "topic": "registration", "question": "how do I register"}
+
+class RecordingStore(InMemoryJobStore):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def put(self, job_id, record):
+        self.records.append(dict(record))
+        super().put(job_id, record)
+
+@pytest.mark.parametrize("text, start, boundary", [
+    ("", 0, 0),
+    ("No sentence ends here", 0, 0),
+    ("One sentence. And a half", 0, 14),
+    ("One. Two! Three? Four", 0, 17),
+    ('He said "stop." Then', 0, 16),
+    ("A sentence (in brackets.) More", 0, 26),
+    # a full stop is only the end of a sentence once the next word has started
+    ("Ends with a stop.", 0, 0),
+    ("Version 1.5 is out", 0, 0),
+    ("One. Two. Three", 5, 10),
+])
+def test_sentence_boundary(text, start, boundary):
+    assert sentence_boundary(text, start) == boundary
+
+def test_streamed_answer_is_recorded_sentence_by_sentence(stub_backend):
+    store = RecordingStore()
+    run_answer_job(store, "job", PARAMS)
+
+    answer = answer_text(PARAMS)
+    assert store.get("job") == {"status": JobStatus.DONE.value, "answer": answer}
+    pending = [record["answer"] for record in store.records if record["status"] == JobStatus.PENDING.value]
+    assert pending
+    for before, after in zip(pending, pending[1:]):
+        assert len(after) > len(before)
+    for text in pending:
+        # every pending record holds whole sentences of the answer
+        assert answer.startswith(text) and sentence_boundary(text + " ") == len(text) + 1
+
+def test_answer_is_cached_for_the_next_job(stub_backend):
+    run_answer_job(InMemoryJobStore(), "first", PARAMS)
+    store = RecordingStore()
+    run_answer_job(store, "second", PARAMS)
+    assert store.records == [{"status": JobStatus.DONE.value, "answer": answer_text(PARAMS)}]
+    assert stub_backend.request_counts["question"] == 1
+
+def test_cached_answer_skips_the_backend(stub_backend):
+    cache_answer(PARAMS, "Cached answer.", persist = False)
+    store = InMemoryJobStore()
+    run_answer_job(store, "job", PARAMS)
+    assert store.get("job") == {"status": JobStatus.DONE.value, "answer": "Cached answer."}
+    assert "question" not in stub_backend.request_counts
+
+def test_plain_json_answer_is_a_single_chunk(stub_backend):
+    stub_backend.stream = False
+    store = RecordingStore()
+    run_answer_job(store, "job", PARAMS)
+    assert store.records == [
+        {"status": JobStatus.PENDING.value, "answer": answer_text(PARAMS)[:sentence_boundary(answer_text(PARAMS))]},
+        {"status": JobStatus.DONE.value, "answer": answer_text(PARAMS)},
+    ]
+
+def test_failed_job_is_recorded_as_failed(stub_backend):
+    stub_backend.stop()
+    store = InMemoryJobStore()
+    with pytest.raises(requests.RequestException):
+        run_answer_job(store, "job", PARAMS)
+    assert store.get("job") == {"status": JobStatus.FAILED.value, "answer": ""}
@@ -0,0 +1,50 @@
+from cache import TTLCache
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(maxsize = 4, ttl = 10, clock = clock)
+    cache.put("a", 1)
+    clock.advance(9.9)
+    assert cache.get("a") == 1
+    clock.advance(0.1)
+    assert cache.get("a") is None
+    assert "a" not in cache
+
+def test_put_refreshes_ttl(clock):
+    cache = TTLCache(maxsize = 4, ttl = 10, clock = clock)
+    cache.put("a", 1)
+    clock.advance(5)
+    cache.put("a", 2)
+    clock.advance(9)
+    assert cache.get("a") == 2
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(maxsize = 2, ttl = 10, clock = clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    # reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_get_or_load_loads_once(clock):
+    cache = TTLCache(maxsize = 2, ttl = 10, clock = clock)
+    loads = []
+    def loader():
+        loads.append(1)
+        return "value"
+    assert cache.get_or_load("a", loader) == "value"
+    assert cache.get_or_load("a", loader) == "value"
+    assert len(loads) == 1
+
+def test_invalidate(clock):
+    cache = TTLCache(maxsize = 4, ttl = 10, clock = clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
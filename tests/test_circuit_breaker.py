@@ -0,0 +1,47 @@
+from circuit_breaker import CircuitBreaker
+
+def open_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold = 2, reset_timeout = 30, clock = clock)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = open_breaker(clock)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold = 2, reset_timeout = 30, clock = clock)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+def test_half_open_lets_one_trial_call_through(clock):
+    breaker = open_breaker(clock)
+    clock.advance(30)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    # only one trial call at a time
+    assert not breaker.allow()
+    assert breaker.state == "half-open"
+
+def test_successful_trial_closes_the_circuit(clock):
+    breaker = open_breaker(clock)
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+def test_failed_trial_reopens_the_circuit(clock):
+    breaker = open_breaker(clock)
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.advance(30)
+    assert breaker.allow()
@@ -0,0 +1,57 @@
+import json
+
+from constants import ATTRIBUTES, DialogState, QuestionType, Status
+from dialog import DIALOG_STATE, SESSION_KEY, advance, decode_session, encode_session, initial_attributes
+
+def attributes_at(state, **values):
+    attributes = initial_attributes()
+    attributes.update(values)
+    attributes[DIALOG_STATE] = state
+    return attributes
+
+def test_session_round_trip():
+    attributes = attributes_at(DialogState.CHECK_ANSWER, question_type = QuestionType.GENERAL.value, faculty = "Faculty of Science",
+        program = "Bachelor of Science", topic = "registration", question = "how do I register", job_id = "abc", spoken = 12)
+    # the envelope goes through JSON on its way to Alexa and back
+    encoded = json.loads(json.dumps(encode_session(attributes)))
+    assert decode_session(encoded) == attributes
+
+def test_trailing_empty_values_are_dropped():
+    attributes = attributes_at(DialogState.PROGRAM, question_type = QuestionType.GENERAL.value, faculty = "Faculty of Science")
+    assert encode_session(attributes) == {SESSION_KEY: [list(DialogState).index(DialogState.PROGRAM), "general", "Faculty of Science"]}
+    assert decode_session(encode_session(attributes)) == attributes
+
+def test_missing_session_decodes_to_the_first_step():
+    for encoded in (None, {}, {SESSION_KEY: []}):
+        attributes = decode_session(encoded)
+        assert attributes[DIALOG_STATE] == DialogState.QUESTION_TYPE
+        assert all(attributes[attribute] == Status.EMPTY for attribute in ATTRIBUTES)
+
+def test_specific_question_asks_every_step():
+    attributes = attributes_at(DialogState.QUESTION_TYPE, question_type = QuestionType.SPECIFIC.value)
+    steps = [advance(attributes)]
+    attributes["faculty"] = "Faculty of Science"
+    steps.append(advance(attributes))
+    attributes["program"] = "Bachelor of Science"
+    steps.append(advance(attributes))
+    assert steps == [DialogState.FACULTY, DialogState.PROGRAM, DialogState.LOAD_SPECIALIZATION]
+
+def test_general_question_skips_specialization_and_year_level():
+    attributes = attributes_at(DialogState.PROGRAM, question_type = QuestionType.GENERAL.value, faculty = "Faculty of Science", program = "Bachelor of Science")
+    assert advance(attributes) == DialogState.TOPIC
+
+def test_another_question_skips_known_steps():
+    attributes = attributes_at(DialogState.QUESTION_TYPE, question_type = QuestionType.SPECIFIC.value, faculty = "Faculty of Science",
+        program = "Bachelor of Science", specialization = "Honours Computer Science", year_level = "Third Year")
+    assert advance(attributes) == DialogState.TOPIC
+    assert attributes[DIALOG_STATE] == DialogState.TOPIC
+
+def test_known_topic_goes_straight_to_the_question():
+    attributes = attributes_at(DialogState.YEAR_LEVEL, question_type = QuestionType.SPECIFIC.value, faculty = "Faculty of Science",
+        program = "Bachelor of Science", specialization = "Honours Computer Science", year_level = "Third Year", topic = "registration")
+    assert advance(attributes) == DialogState.QUESTION
+
+def test_profile_starts_with_its_confirmation():
+    attributes = initial_attributes({"faculty": "Faculty of Science", "program": "Bachelor of Science", "specialization": "", "year_level": ""})
+    assert attributes[DIALOG_STATE] == DialogState.CONFIRM_PROFILE
+    assert advance(attributes) == DialogState.QUESTION_TYPE
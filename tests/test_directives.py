@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+from ask_sdk_core.response_helper import ResponseFactory
+from ask_sdk_model.er.dynamic import UpdateBehavior
+
+from directives import build_entity, build_replace_directive, clear_dynamic_entities, get_catalog_directive, replace_dynamic_entities
+
+def handler_input():
+    return SimpleNamespace(response_builder = ResponseFactory())
+
+def updates(handler_input):
+    return [(directive.types[0].name, directive.update_behavior) for directive in handler_input.response_builder.response.directives or []]
+
+def replace(slot_name = "CATCHALL"):
+    return build_replace_directive([build_entity("program", "Bachelor of Science")], slot_name)
+
+def test_replace_overrides_a_clear():
+    handler = handler_input()
+    clear_dynamic_entities(handler)
+    directive = replace()
+    replace_dynamic_entities(handler, directive)
+    assert handler.response_builder.response.directives == [directive]
+
+def test_last_replace_wins():
+    handler = handler_input()
+    replace_dynamic_entities(handler, replace())
+    directive = replace()
+    replace_dynamic_entities(handler, directive)
+    assert handler.response_builder.response.directives == [directive]
+
+def test_clear_overrides_a_replace():
+    handler = handler_input()
+    replace_dynamic_entities(handler, replace())
+    clear_dynamic_entities(handler)
+    assert updates(handler) == [("CATCHALL", UpdateBehavior.CLEAR)]
+
+def test_clear_is_sent_once():
+    handler = handler_input()
+    clear_dynamic_entities(handler)
+    clear_dynamic_entities(handler)
+    assert updates(handler) == [("CATCHALL", UpdateBehavior.CLEAR)]
+
+def test_other_slots_are_kept():
+    handler = handler_input()
+    replace_dynamic_entities(handler, replace("OTHER"))
+    clear_dynamic_entities(handler)
+    replace_dynamic_entities(handler, replace())
+    assert updates(handler) == [("OTHER", UpdateBehavior.REPLACE), ("CATCHALL", UpdateBehavior.REPLACE)]
+
+def test_catalog_directives_are_reused():
+    programs = ["Bachelor of Arts", "Bachelor of Science"]
+    directive = get_catalog_directive("program", programs)
+    assert get_catalog_directive("program", list(programs)) is directive
+    assert [entity.id for entity in directive.types[0].values] == ["program:bachelor_of_arts", "program:bachelor_of_science"]
@@ -0,0 +1,44 @@
+from directives import build_entity, build_replace_directive
+from entity_budget import entity_size, fit_budget, rank_by_use, record_use
+
+def entities(count):
+    return [build_entity("program", f"Bachelor of Science {number}") for number in range(count)]
+
+def test_everything_fits():
+    kept, trimmed = fit_budget(entities(3), max_count = 5, max_bytes = 10000)
+    assert len(kept) == 3 and trimmed == []
+
+def test_count_limit():
+    values = entities(5)
+    kept, trimmed = fit_budget(values, max_count = 2, max_bytes = 10000)
+    assert kept == values[:2]
+    assert trimmed == values[2:]
+
+def test_byte_limit_counts_the_separators():
+    values = entities(3)
+    two = entity_size(values[0]) + 1 + entity_size(values[1])
+    kept, trimmed = fit_budget(values, max_count = 10, max_bytes = two)
+    assert kept == values[:2] and trimmed == values[2:]
+    kept, trimmed = fit_budget(values, max_count = 10, max_bytes = two - 1)
+    assert kept == values[:1]
+
+def test_byte_limit_includes_the_overhead():
+    values = entities(2)
+    overhead = entity_size(build_replace_directive([]))
+    kept, _ = fit_budget(values, max_count = 10, max_bytes = overhead + entity_size(values[0]), overhead = overhead)
+    assert kept == values[:1]
+
+def test_kept_entities_fit_the_serialized_directive():
+    values = entities(50)
+    overhead = entity_size(build_replace_directive([]))
+    kept, trimmed = fit_budget(values, max_count = 100, max_bytes = 2000, overhead = overhead)
+    assert trimmed
+    assert entity_size(build_replace_directive(kept)) <= 2000
+
+def test_rank_by_use_is_stable():
+    kind = "test_rank_by_use"
+    record_use(kind, "c")
+    record_use(kind, "c")
+    record_use(kind, "b")
+    assert rank_by_use(kind, ["a", "b", "c", "d"]) == ["c", "b", "a", "d"]
+    assert rank_by_use("test_unused_kind", ["b", "a"]) == ["b", "a"]
@@ -0,0 +1,32 @@
+import json
+import os
+import shutil
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "scripts"))
+
+import generate_interaction_model as generator
+
+SAMPLE_CATALOG = os.path.join(ROOT_DIR, "scripts", "fixtures", "catalog.json")
+
+def test_committed_model_matches_the_sample_catalog():
+    assert generator.main(["--catalog", SAMPLE_CATALOG, "--check"]) == 0
+
+def test_check_detects_a_changed_catalog(tmp_path):
+    with open(SAMPLE_CATALOG) as catalog_file:
+        catalog = json.load(catalog_file)
+    catalog["Faculty of Law"] = {"Juris Doctor": []}
+    catalog_path = tmp_path / "catalog.json"
+    catalog_path.write_text(json.dumps(catalog))
+    model_path = tmp_path / "en-CA.json"
+    shutil.copy(generator.MODEL_PATH, model_path)
+
+    assert generator.main(["--catalog", str(catalog_path), "--model", str(model_path), "--check"]) == 1
+    assert generator.main(["--catalog", str(catalog_path), "--model", str(model_path)]) == 0
+    assert generator.main(["--catalog", str(catalog_path), "--model", str(model_path), "--check"]) == 0
+
+    types = json.loads(model_path.read_text())["interactionModel"]["languageModel"]["types"]
+    values = next(slot for slot in types if slot["name"] == "CATCHALL")["values"]
+    law = next(value for value in values if value.get("id") == "faculty:faculty_of_law")
+    assert "law" in law["name"]["synonyms"]
@@ -0,0 +1,45 @@
+from spec_index import SpecializationIndex, normalize
+
+SPECS = [
+    "Major in Computer Science",
+    "Honours Computer Science",
+    "Combined Major in Computer Science and Statistics",
+    "Major in Statistics",
+    "Honours Biology",
+    "Major in Mathematics",
+]
+
+def test_normalize():
+    assert normalize("  Honours: Computer-Science!  ") == "honours computerscience"
+
+def test_whole_phrase_match_ranks_first():
+    index = SpecializationIndex(SPECS)
+    assert index.search("honours computer science")[0] == "Honours Computer Science"
+    assert index.search("major in computer science")[0] == "Major in Computer Science"
+
+def test_every_query_token_must_match():
+    index = SpecializationIndex(SPECS)
+    assert index.search("computer statistics") == ["Combined Major in Computer Science and Statistics"]
+
+def test_shorter_names_rank_before_longer_ones():
+    index = SpecializationIndex(SPECS)
+    assert index.search("computer") == ["Honours Computer Science", "Major in Computer Science", "Combined Major in Computer Science and Statistics"]
+
+def test_prefix_match():
+    index = SpecializationIndex(SPECS)
+    assert index.search("stat") == ["Major in Statistics", "Combined Major in Computer Science and Statistics"]
+
+def test_fuzzy_match():
+    index = SpecializationIndex(SPECS)
+    # "honors" is a near miss of "honours", "biologie" of "biology"
+    assert index.search("honors biologie") == ["Honours Biology"]
+
+def test_stop_words_are_ignored():
+    index = SpecializationIndex(SPECS)
+    assert index.search("the mathematics") == ["Major in Mathematics"]
+
+def test_limit_and_no_match():
+    index = SpecializationIndex(SPECS)
+    assert len(index.search("major", limit = 2)) == 2
+    assert index.search("astronomy") == []
+    assert index.search("") == []